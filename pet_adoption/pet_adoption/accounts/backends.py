@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from adoption.cache_backends import is_shared
+
+# Everything request.user is built from, except the password hash.
+CACHED_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+def _user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose get_user(), run by AuthenticationMiddleware on every
+    logged-in request, reads the user from the cache for AUTH_USER_CACHE_SECONDS.
+
+    The cache holds the user's fields and session auth hash, never the password
+    hash. The cached user loads the password from the database only if something
+    reads it, and save() leaves it alone.
+
+    Saving or deleting the user drops the entry, so password changes and deactivation
+    apply on the next request; other processes follow within the tiered cache's
+    LOCAL_TIMEOUT. While the cache is not shared between processes (Redis down or
+    missing) every request reads the database instead, since a drop would not reach
+    the other processes. QuerySet.update() on users sends no post_save: pass
+    those users to expire_users() or let AUTH_USER_CACHE_SECONDS run out.
+    """
+
+    def get_user(self, user_id):
+        timeout = settings.AUTH_USER_CACHE_SECONDS
+        if not timeout or not is_shared(caches[DEFAULT_CACHE_ALIAS]):
+            return super().get_user(user_id)
+        key = _user_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, {
+                    'fields': [getattr(user, name) for name in CACHED_FIELDS],
+                    'session_auth_hash': user.get_session_auth_hash(),
+                }, timeout)
+            return user
+        user = User.from_db(DEFAULT_DB_ALIAS, CACHED_FIELDS, entry['fields'])
+        # What django.contrib.auth.get_user() checks the session against, without the password.
+        user.get_session_auth_hash = lambda: entry['session_auth_hash']
+        return user if self.user_can_authenticate(user) else None
+
+
+def expire_users(user_ids):
+    cache.delete_many([_user_key(user_id) for user_id in user_ids])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def expire_cached_user(sender, instance, **kwargs):
+    expire_users([instance.pk])
@@ -0,0 +1,56 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+
+from adoption.cache_backends import is_shared
+from adoption.management.commands.benchmark_views import Command as BenchmarkViews, Target
+
+
+class Command(BaseCommand):
+    help = (
+        "Time logged-in requests to pet_list under every SESSION_MODE, with and without the user cache, and "
+        "report latency and queries per request as JSON. The differences are the session and auth overhead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Timed requests per mode, split across the workers.")
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per worker; the first fills the caches.")
+        parser.add_argument('--mode', choices=list(settings.SESSION_ENGINES), action='append', help="Default: all modes.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_staff=False, is_active=True).order_by('pk').first()
+        if user is None:
+            raise CommandError("No user to log in as; run seed_scale first.")
+        target = Target('adoption:pet_list', reverse('adoption:pet_list'), user)
+        benchmark = BenchmarkViews(stdout=self.stdout, stderr=self.stderr)
+        # The page itself comes from the cache after the warmup, so what is left is mostly session and auth.
+        results = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for mode in options['mode'] or list(settings.SESSION_ENGINES):
+                for user_cache in (False, True):
+                    seconds = (settings.AUTH_USER_CACHE_SECONDS or 300) if user_cache else 0
+                    with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[mode], AUTH_USER_CACHE_SECONDS=seconds):
+                        result = benchmark.run(target, options['requests'], options['workers'], options['warmup'])
+                    results.append({
+                        'session_mode': mode,
+                        'user_cache': user_cache,
+                        'latency_ms': result['latency_ms'],
+                        'throughput_rps': result['throughput_rps'],
+                        'queries': result['queries'],
+                        'errors': result['errors'],
+                    })
+        self.stdout.write(json.dumps({
+            'path': target.path,
+            'user': user.username,
+            'workers': options['workers'],
+            'requests_per_mode': options['requests'],
+            # Without a shared cache the user cache and cached_db sessions read the database.
+            'shared_cache': is_shared(caches[DEFAULT_CACHE_ALIAS]),
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,24 @@
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+from adoption.cache_backends import is_shared
+
+
+class SessionStore(cached_db.SessionStore):
+    """cached_db sessions that read the database while the cache is not shared.
+
+    On a per-process cache a logout in one process would leave the session
+    cached, and logged in, in all the others.
+    """
+
+    def load(self):
+        return super().load() if is_shared(self._cache) else DBStore.load(self)
+
+    async def aload(self):
+        return await super().aload() if is_shared(self._cache) else await DBStore.aload(self)
+
+    def exists(self, session_key):
+        return super().exists(session_key) if is_shared(self._cache) else DBStore.exists(self, session_key)
+
+    async def aexists(self, session_key):
+        return await super().aexists(session_key) if is_shared(self._cache) else await DBStore.aexists(self, session_key)
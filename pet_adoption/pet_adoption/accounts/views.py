@@ -5,10 +5,10 @@ from django.views.decorators.cache import never_cache
 from django.contrib import messages
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.models import User
-from django.core.mail import send_mail
 from django.conf import settings
 from .forms import CustomUserCreationForm
 from .models import UserProfile
+from adoption.outbox import queue_mail
 
 def register(request):
     if request.method == 'POST':
@@ -43,7 +43,7 @@ def forgot_password(request):
             reset_link = request.build_absolute_uri(f"/accounts/reset-password/{user.pk}/{token}/")
             subject = 'Password Reset Request'
             message = f"Click the link to reset your password: {reset_link}"
-            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
+            queue_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
             messages.success(request, 'A password reset link has been sent to your email.')
             return redirect('accounts:login')
         except User.DoesNotExist:
@@ -1,29 +1,84 @@
 from django.contrib import admin
-from .models import Pet, AdoptionRequest, SuccessStory, Message
+from .models import Pet, AdoptionRequest, SuccessStory, Conversation, Message, OutgoingEmail
+from .exports import EXPORT_NAMES, streaming_response
+from .admin_tools import LargeTableAdmin, TopValuesFilter, username_filter
+from . import search
+
+class ExportActionsMixin:
+    """Admin actions that stream the selected rows (or, with "select all", every match) as a file."""
+    actions = ['export_csv', 'export_jsonl']
+
+    @admin.action(description="Export selected as CSV")
+    def export_csv(self, request, queryset):
+        return streaming_response(EXPORT_NAMES[self.model], queryset, 'csv')
+
+    @admin.action(description="Export selected as JSON Lines")
+    def export_jsonl(self, request, queryset):
+        return streaming_response(EXPORT_NAMES[self.model], queryset, 'jsonl')
+
+class LocationFilter(TopValuesFilter):
+    title = 'location'
+    parameter_name = 'location'
+    field = 'location'
 
 @admin.register(Pet)
-class PetAdmin(admin.ModelAdmin):
+class PetAdmin(LargeTableAdmin):
     list_display = ('name', 'pet_type', 'breed', 'age', 'vaccination_status', 'owner', 'location', 'created_at')
-    list_filter = ('pet_type', 'vaccination_status', 'location')
+    list_filter = ('pet_type', 'vaccination_status', LocationFilter, username_filter('owner'))
+    list_select_related = ('owner',)
+    autocomplete_fields = ('owner', 'adopter')
     search_fields = ('name', 'breed', 'location')
-    list_per_page = 25
+    search_table = search.TABLE
+    search_help_text = "Name, breed or location words."
 
 @admin.register(AdoptionRequest)
-class AdoptionRequestAdmin(admin.ModelAdmin):
+class AdoptionRequestAdmin(ExportActionsMixin, LargeTableAdmin):
     list_display = ('pet', 'adopter', 'status', 'created_at')
-    list_filter = ('status',)
-    search_fields = ('pet__name', 'adopter__username')
-    list_per_page = 25
+    list_filter = ('status', username_filter('adopter'))
+    list_select_related = ('pet', 'adopter')
+    autocomplete_fields = ('pet', 'adopter')
+    search_fields = ('pet__name',)
+    search_table = search.TABLE
+    search_lookup = 'pet_id'
+    search_help_text = "Words from the pet's name, breed or location. Filter adopters on the right."
 
 @admin.register(SuccessStory)
-class SuccessStoryAdmin(admin.ModelAdmin):
+class SuccessStoryAdmin(ExportActionsMixin, LargeTableAdmin):
     list_display = ('pet', 'adopter', 'created_at')
-    search_fields = ('pet__name', 'adopter__username', 'story')
-    list_per_page = 25
+    list_filter = (username_filter('adopter'),)
+    list_select_related = ('pet', 'adopter')
+    autocomplete_fields = ('pet', 'adopter')
+    search_fields = ('pet__name',)
+    search_table = search.TABLE
+    search_lookup = 'pet_id'
+    search_help_text = "Words from the pet's name, breed or location."
+
+@admin.register(Conversation)
+class ConversationAdmin(LargeTableAdmin):
+    list_display = ('pet', 'owner', 'adopter', 'last_message_at', 'pinned_count', 'owner_unread', 'adopter_unread')
+    list_filter = (username_filter('owner'), username_filter('adopter'))
+    list_select_related = ('pet', 'owner', 'adopter')
+    autocomplete_fields = ('pet', 'owner', 'adopter')
+    raw_id_fields = ('last_message',)
+    search_fields = ('pet__name',)
+    search_table = search.TABLE
+    search_lookup = 'pet_id'
+    search_help_text = "Words from the pet's name, breed or location."
 
 @admin.register(Message)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(ExportActionsMixin, LargeTableAdmin):
     list_display = ('sender', 'receiver', 'pet', 'created_at')
-    list_filter = ('created_at',)
-    search_fields = ('sender__username', 'receiver__username', 'pet__name', 'content')
-    list_per_page = 25
\ No newline at end of file
+    list_filter = ('created_at', username_filter('sender'), username_filter('receiver'))
+    list_select_related = ('sender', 'receiver', 'pet')
+    autocomplete_fields = ('sender', 'receiver', 'pet')
+    raw_id_fields = ('conversation',)
+    search_fields = ('content',)
+    search_table = search.MESSAGE_TABLE
+    search_help_text = "Words in the message. Filter senders and receivers on the right."
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('subject',)
+    list_per_page = 25
@@ -0,0 +1,109 @@
+import hashlib
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db.models import Count
+from django.utils.functional import cached_property
+
+from . import search
+
+COUNT_CAP = 50_000
+COUNT_CACHE_SECONDS = 60
+FACET_LIMIT = 20
+FACET_CACHE_SECONDS = 600
+
+
+class CappedCountPaginator(Paginator):
+    """Counts at most COUNT_CAP rows and reuses the count for COUNT_CACHE_SECONDS.
+
+    An exact COUNT(*) over millions of rows costs more than the page itself; past
+    the cap nobody pages through the results anyway, and a changelist count that is
+    a minute old is fine.
+    """
+
+    @cached_property
+    def count(self):
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return 0
+        key = f"admin:count:{hashlib.md5(sql.encode(), usedforsecurity=False).hexdigest()}"
+        return cache.get_or_set(key, lambda: self.object_list.order_by()[:COUNT_CAP].count(), COUNT_CACHE_SECONDS)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables too large to count, sort or LIKE-scan per page view.
+
+    Subclasses set list_select_related for their FK columns and, where the search box
+    should use full-text search, search_table (an FTS5 table) and search_lookup (the
+    field holding its rowid).
+    """
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    # Newest first along the primary key, so a page never sorts the whole table.
+    ordering = ('-pk',)
+    list_per_page = 25
+    search_table = None
+    search_lookup = 'pk'
+
+    def get_search_results(self, request, queryset, search_term):
+        if not self.search_table or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        match = search.build_match(search_term)
+        if match is None:
+            return queryset, False
+        # Common words match a large part of the table; like the count, stop at COUNT_CAP.
+        ids = search.matching_ids(self.search_table, match, limit=COUNT_CAP)
+        return queryset.filter(**{f'{self.search_lookup}__in': ids}), False
+
+
+class InputFilter(admin.SimpleListFilter):
+    """A text box filter, for values with too many distinct choices to list."""
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # SimpleListFilter only renders when it has at least one choice.
+        return [(None, None)]
+
+    def choices(self, changelist):
+        # Everything else in the query string rides along, except the page number.
+        yield {'query_parts': [
+            (key, value) for key, values in changelist.params.items()
+            if key not in (self.parameter_name, 'p') for value in values
+        ]}
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value().strip()})
+        return queryset
+
+
+def username_filter(field):
+    """InputFilter matching a user FK by exact username, which the auth_user index serves."""
+    return type(f'{field.title()}Filter', (InputFilter,), {
+        'title': field,
+        'parameter_name': f'{field}_username',
+        'lookup': f'{field}__username',
+    })
+
+
+class TopValuesFilter(admin.SimpleListFilter):
+    """Offers only the FACET_LIMIT most common values of a field, counted once per FACET_CACHE_SECONDS."""
+    field = None
+
+    def lookups(self, request, model_admin):
+        def top_values():
+            return list(
+                model_admin.model.objects.values(self.field).annotate(count=Count('pk'))
+                .order_by('-count', self.field).values_list(self.field, flat=True)[:FACET_LIMIT]
+            )
+        values = cache.get_or_set(f"admin:facets:{model_admin.model._meta.label}:{self.field}", top_values, FACET_CACHE_SECONDS)
+        return [(value, value) for value in values]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field: self.value()})
+        return queryset
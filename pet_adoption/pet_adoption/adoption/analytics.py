@@ -0,0 +1,197 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Pet, AdoptionRequest, RollupState, RollupDirtyDay,
+    DailyListingStat, DailyRequestStat, DailyAdoptionStat, DailyUserActivity,
+)
+
+# Rows are picked up again this long before the high-water mark, so a transaction
+# that committed late with an older timestamp is not missed. Recomputing a day is
+# idempotent, so the overlap only costs a little repeated work.
+OVERLAP = timedelta(minutes=5)
+TOP_USERS = 10
+TOP_LOCATIONS = 10
+RUNS_PER_QUERY = 100
+
+# source name -> (queryset, field that moves when a row changes, field that picks its day).
+# Rows that leave a source (deletions, undone adoptions) cannot move its high-water
+# mark; signals record their old days with mark_dirty() instead.
+SOURCES = {
+    'listings': (Pet.objects.all(), 'updated_at', 'created_at'),
+    'requests': (AdoptionRequest.objects.all(), 'updated_at', 'created_at'),
+    'adoptions': (Pet.objects.filter(adopted_at__isnull=False), 'updated_at', 'adopted_at'),
+}
+
+
+def mark_dirty(source, moment):
+    """Have the next update_rollups() recompute the day of `moment` for `source`."""
+    if moment is not None:
+        RollupDirtyDay.objects.bulk_create(
+            [RollupDirtyDay(source=source, day=timezone.localdate(moment))], ignore_conflicts=True,
+        )
+
+
+def _runs(days):
+    """Sorted (first, last) pairs of consecutive days."""
+    runs = []
+    for day in sorted(days):
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def _in_spans(field, days):
+    """Filters that together cover exactly `days`, one range per run of consecutive days.
+
+    An old edit next to today's events rescans two short runs, not everything in
+    between. Plain range filters rather than __date so the created_at/adopted_at
+    indexes apply; at most RUNS_PER_QUERY ranges are OR-ed into one filter, which
+    keeps sparse days under SQLite's expression depth limit.
+    """
+    runs = _runs(days)
+    for chunk in range(0, len(runs), RUNS_PER_QUERY):
+        span = Q(pk__in=[])
+        for first, last in runs[chunk:chunk + RUNS_PER_QUERY]:
+            span |= Q(**{
+                f'{field}__gte': timezone.make_aware(datetime.combine(first, time.min)),
+                f'{field}__lt': timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min)),
+            })
+        yield span
+
+
+def _changes(source, since):
+    """Days touched by rows changed after `since`, plus the new high-water mark."""
+    queryset, changed_field, day_field = SOURCES[source]
+    if since is not None:
+        queryset = queryset.filter(**{f'{changed_field}__gt': since - OVERLAP})
+    days = set(queryset.annotate(day=TruncDate(day_field)).values_list('day', flat=True).distinct())
+    latest = queryset.aggregate(latest=Max(changed_field))['latest']
+    return days, max(filter(None, [since, latest]), default=None)
+
+
+def _replace_days(model, days, rows):
+    model.objects.filter(day__in=days).delete()
+    model.objects.bulk_create(rows)
+
+
+def _rollup_listings(days):
+    rows = [
+        row for span in _in_spans('created_at', days)
+        for row in Pet.objects.filter(span)
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'pet_type', 'location')
+        .annotate(count=Count('id'))
+    ]
+    _replace_days(DailyListingStat, days, [DailyListingStat(**row) for row in rows])
+
+
+def _rollup_requests(days):
+    rows = [
+        row for span in _in_spans('created_at', days)
+        for row in AdoptionRequest.objects.filter(span)
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'status')
+        .annotate(count=Count('id'))
+    ]
+    _replace_days(DailyRequestStat, days, [DailyRequestStat(**row) for row in rows])
+
+
+def _rollup_adoptions(days):
+    totals = defaultdict(lambda: [0, 0])
+    pets = [
+        pet for span in _in_spans('adopted_at', days)
+        for pet in Pet.objects.filter(span).values_list('created_at', 'adopted_at')
+    ]
+    for created_at, adopted_at in pets:
+        entry = totals[timezone.localdate(adopted_at)]
+        entry[0] += 1
+        entry[1] += int((adopted_at - created_at).total_seconds())
+    _replace_days(DailyAdoptionStat, days, [
+        DailyAdoptionStat(day=day, adoptions=adoptions, wait_seconds=wait)
+        for day, (adoptions, wait) in totals.items()
+    ])
+
+
+def _rollup_user_activity(days):
+    # Pets and requests are counted in separate grouped queries; joining both onto
+    # User in one query multiplies the two counts by each other.
+    activity = defaultdict(lambda: [0, 0])
+    for column, model, user_field in ((0, Pet, 'owner_id'), (1, AdoptionRequest, 'adopter_id')):
+        rows = [
+            row for span in _in_spans('created_at', days)
+            for row in model.objects.filter(span)
+            .annotate(day=TruncDate('created_at'))
+            .values_list('day', user_field)
+            .annotate(count=Count('id'))
+        ]
+        for day, user_id, count in rows:
+            activity[day, user_id][column] = count
+    _replace_days(DailyUserActivity, days, [
+        DailyUserActivity(day=day, user_id=user_id, pets_listed=pets, requests_made=requests)
+        for (day, user_id), (pets, requests) in activity.items()
+    ])
+
+
+def update_rollups(rebuild=False):
+    """Fold raw rows changed since the last run into the daily rollups.
+
+    Every day touched by a change, or marked with mark_dirty(), is recomputed from
+    the raw rows of that day only. Returns {source: number of days recomputed}.
+    """
+    with transaction.atomic():
+        if rebuild:
+            for model in (DailyListingStat, DailyRequestStat, DailyAdoptionStat, DailyUserActivity, RollupDirtyDay):
+                model.objects.all().delete()
+            RollupState.objects.all().delete()
+        states = {state.source: state for state in RollupState.objects.select_for_update()}
+        dirty = list(RollupDirtyDay.objects.select_for_update())
+        touched = {}
+        for source in SOURCES:
+            state = states.get(source) or RollupState(source=source)
+            touched[source], state.high_water_mark = _changes(source, state.high_water_mark)
+            touched[source] |= {row.day for row in dirty if row.source == source}
+            state.save()
+        RollupDirtyDay.objects.filter(pk__in=[row.pk for row in dirty]).delete()
+        _rollup_listings(touched['listings'])
+        _rollup_requests(touched['requests'])
+        _rollup_adoptions(touched['adoptions'])
+        _rollup_user_activity(touched['listings'] | touched['requests'])
+    return {source: len(days) for source, days in touched.items()}
+
+
+def summary(start, end):
+    """Everything the analytics dashboard shows for [start, end], read from the rollups only."""
+    in_range = Q(day__gte=start, day__lte=end)
+    adoptions = DailyAdoptionStat.objects.filter(in_range).aggregate(count=Sum('adoptions'), wait=Sum('wait_seconds'))
+    return {
+        'pet_types': (
+            DailyListingStat.objects.filter(in_range).values('pet_type')
+            .annotate(count=Sum('count')).order_by('-count', 'pet_type')
+        ),
+        'locations': (
+            DailyListingStat.objects.filter(in_range).values('location')
+            .annotate(count=Sum('count')).order_by('-count', 'location')[:TOP_LOCATIONS]
+        ),
+        'adoption_stats': (
+            DailyRequestStat.objects.filter(in_range).values('status')
+            .annotate(count=Sum('count')).order_by('status')
+        ),
+        'adoptions': adoptions['count'] or 0,
+        'average_days_to_adoption': (
+            adoptions['wait'] / adoptions['count'] / 86400 if adoptions['count'] else None
+        ),
+        'user_activity': (
+            DailyUserActivity.objects.filter(in_range).values('user__username')
+            .annotate(pet_count=Sum('pets_listed'), request_count=Sum('requests_made'))
+            .order_by('-pet_count', '-request_count')[:TOP_USERS]
+        ),
+        'updated_at': RollupState.objects.aggregate(latest=Max('updated_at'))['latest'],
+    }
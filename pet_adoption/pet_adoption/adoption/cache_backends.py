@@ -0,0 +1,249 @@
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+from . import perf
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRU:
+    """Small thread-safe LRU with per-entry expiry, holding pickled values.
+
+    Values are pickled like in LocMemCache so callers never share mutable objects.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the pickled value, or None when missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, pickled = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return pickled
+
+    def set(self, key, value, ttl):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache(BaseCache):
+    """A per-process LRU in front of a shared cache such as Redis.
+
+    OPTIONS:
+        SHARED: cache config dict ({'BACKEND': ..., 'LOCATION': ..., 'OPTIONS': ...}).
+        LOCAL_MAX_ENTRIES: size of the in-process LRU (default 1000).
+        LOCAL_TIMEOUT: longest an entry may be served from the LRU (default 5s).
+            Other processes' writes and deletes only reach this process through
+            the shared tier, so this bounds how stale a local hit can be.
+        RETRY_INTERVAL: seconds to stay on the fallback after the shared cache
+            errors before trying it again (default 30s).
+        FALLBACK_MAX_ENTRIES: size of the locmem fallback (default 10000).
+
+    If the shared backend cannot be imported (e.g. no redis client) or errors, the
+    cache keeps working on a per-process LocMemCache instead of failing requests.
+    """
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        self._shared_config = options.pop('SHARED', None)
+        self._local_timeout = options.pop('LOCAL_TIMEOUT', 5)
+        self._retry_interval = options.pop('RETRY_INTERVAL', 30)
+        local_max_entries = options.pop('LOCAL_MAX_ENTRIES', 1000)
+        fallback_max_entries = options.pop('FALLBACK_MAX_ENTRIES', 10000)
+        params['OPTIONS'] = options
+        super().__init__(params)
+        self._local = LocalLRU(local_max_entries)
+        self._fallback = LocMemCache(f'tiered-fallback-{location}', {
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'OPTIONS': {'MAX_ENTRIES': fallback_max_entries},
+        })
+        self._shared = None
+        self._shared_down_until = 0
+        self._counters_lock = threading.Lock()
+        self.reset_stats()
+        if self._shared_config:
+            try:
+                config = dict(self._shared_config)
+                backend = import_string(config.pop('BACKEND'))
+                self._shared = backend(config.pop('LOCATION', ''), config)
+            except ImportError as e:
+                logger.warning(f"Shared cache backend unavailable, using local memory only: {e}")
+
+    # Counters ---------------------------------------------------------------
+
+    def reset_stats(self):
+        with self._counters_lock:
+            self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'sets': 0, 'errors': 0}
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._stats[name] += amount
+        # stats() is process-wide; this keeps a per-request tally for PerformanceMiddleware.
+        perf.count(f'cache_{name}', amount)
+
+    def stats(self):
+        with self._counters_lock:
+            stats = dict(self._stats)
+        stats['hits'] = stats['local_hits'] + stats['shared_hits']
+        stats['local_entries'] = len(self._local)
+        stats['fallback'] = self._using_fallback()
+        return stats
+
+    # Shared tier ------------------------------------------------------------
+
+    def _using_fallback(self):
+        return self._shared is None or time.monotonic() < self._shared_down_until
+
+    def _call_shared(self, method, *args, **kwargs):
+        if not self._using_fallback():
+            try:
+                return getattr(self._shared, method)(*args, **kwargs)
+            except ImportError as e:
+                # Backends like RedisCache import their client lazily; that won't fix itself.
+                logger.warning(f"Shared cache backend unavailable, using local memory only: {e}")
+                self._shared = None
+            except Exception as e:
+                self._count('errors')
+                self._shared_down_until = time.monotonic() + self._retry_interval
+                logger.warning(f"Shared cache {method} failed, falling back to local memory for {self._retry_interval}s: {e}")
+        return getattr(self._fallback, method)(*args, **kwargs)
+
+    def _local_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        return self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+
+    # Cache API --------------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        pickled = self._local.get(local_key)
+        if pickled is not None:
+            self._count('local_hits')
+            return pickle.loads(pickled)
+        value = self._call_shared('get', key, self._missing_key, version=version)
+        if value is self._missing_key:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        self._local.set(local_key, value, self._local_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._count('sets')
+        self._call_shared('set', key, value, timeout=timeout, version=version)
+        self._local.set(local_key, value, self._local_ttl(timeout))
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            pickled = self._local.get(self.make_and_validate_key(key, version=version))
+            if pickled is None:
+                remote.append(key)
+            else:
+                found[key] = pickle.loads(pickled)
+        self._count('local_hits', len(found))
+        if remote:
+            # One round trip to the shared tier for everything the LRU did not have.
+            shared = self._call_shared('get_many', remote, version=version)
+            for key, value in shared.items():
+                self._local.set(self.make_and_validate_key(key, version=version), value, self._local_timeout)
+            self._count('shared_hits', len(shared))
+            self._count('misses', len(remote) - len(shared))
+            found.update(shared)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._count('sets', len(data))
+        failed = self._call_shared('set_many', data, timeout=timeout, version=version)
+        ttl = self._local_ttl(timeout)
+        for key, value in data.items():
+            self._local.set(self.make_and_validate_key(key, version=version), value, ttl)
+        return failed or []
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._local.delete(self.make_and_validate_key(key, version=version))
+        self._call_shared('delete_many', keys, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        added = self._call_shared('add', key, value, timeout=timeout, version=version)
+        if added:
+            self._local.set(local_key, value, self._local_ttl(timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local.delete(self.make_and_validate_key(key, version=version))
+        return self._call_shared('touch', key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local.delete(self.make_and_validate_key(key, version=version))
+        return self._call_shared('delete', key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local.get(self.make_and_validate_key(key, version=version)) is not None:
+            return True
+        return self._call_shared('has_key', key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._local.delete(self.make_and_validate_key(key, version=version))
+        return self._call_shared('incr', key, delta, version=version)
+
+    def clear(self):
+        self._local.clear()
+        self._fallback.clear()
+        if self._shared is not None:
+            self._call_shared('clear')
+
+    def close(self, **kwargs):
+        if self._shared is not None:
+            self._shared.close(**kwargs)
+
+
+def is_shared(cache):
+    """Whether all processes see the same `cache`, so a delete in one reaches the others.
+
+    Not for per-process backends, nor for a TieredCache running on its fallback.
+    Anything whose expiry revokes access (sessions, logged-in users) should bypass
+    the cache then. A TieredCache's local tier still lags by up to LOCAL_TIMEOUT.
+    Takes a backend from caches[alias], not the django.core.cache.cache proxy.
+    """
+    if isinstance(cache, TieredCache):
+        return not cache._using_fallback()
+    return not isinstance(cache, (LocMemCache, DummyCache))
@@ -0,0 +1,110 @@
+import hashlib
+from time import time_ns
+
+from django.core.cache import cache
+
+from .models import Pet, SuccessStory
+
+DASHBOARD_CACHE_SECONDS = 300
+PET_CACHE_SECONDS = 300
+PET_CARD_CACHE_SECONDS = 24 * 3600
+SUCCESS_STORIES_KEY = 'success_stories'
+PET_LIST_GENERATION_KEY = 'pets:generation'
+
+
+def _dashboard_key(user_id):
+    return f"dashboard:version:{user_id}"
+
+
+def dashboard_version(user_id):
+    """Version stamp that is part of every cached dashboard fragment key for a user.
+
+    Bumping it orphans the old fragments, which then simply expire.
+    """
+    return cache.get_or_set(_dashboard_key(user_id), time_ns, timeout=None)
+
+
+def expire_dashboards(user_ids):
+    cache.set_many({_dashboard_key(user_id): time_ns() for user_id in user_ids if user_id}, timeout=None)
+
+
+def _pet_key(pk):
+    return f"pet:{pk}"
+
+
+def _card_key(pk):
+    return f"pet:card:{pk}"
+
+
+def _cache_aside(key, compute, timeout=PET_CACHE_SECONDS):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            cache.set(key, value, timeout)
+    return value
+
+
+def cached_pet(pk):
+    """The pet with its owner, or None if it does not exist."""
+    return _cache_aside(_pet_key(pk), lambda: Pet.objects.select_related('owner').filter(pk=pk).first())
+
+
+def cached_success_stories():
+    return _cache_aside(SUCCESS_STORIES_KEY, lambda: list(SuccessStory.objects.select_related('pet', 'adopter')))
+
+
+def pet_list_generation():
+    return cache.get_or_set(PET_LIST_GENERATION_KEY, time_ns, timeout=None)
+
+
+def cached_pet_page(filters, compute):
+    """Cache-aside for one pet_list page, keyed by its filters and cursor.
+
+    Every pet change moves the list generation on, so all cached pages are dropped
+    at once instead of working out which filters a pet used to match.
+    """
+    generation = pet_list_generation()
+    digest = hashlib.md5(repr(filters).encode(), usedforsecurity=False).hexdigest()
+    return _cache_aside(f"pets:page:{generation}:{digest}", compute)
+
+
+def cached_pet_facets(filters, compute):
+    """Cache-aside for the pet_list facet counts; same generation scheme as cached_pet_page."""
+    generation = pet_list_generation()
+    digest = hashlib.md5(repr(filters).encode(), usedforsecurity=False).hexdigest()
+    return _cache_aside(f"pets:facet-counts:{generation}:{digest}", compute)
+
+
+def attach_card_versions(pets):
+    """Set pet.card_version, which keys the pet's cached card fragments, on each pet.
+
+    One cache round trip for the whole page; a pet without a version gets a fresh one.
+    """
+    pets = list(pets)
+    keys = {_card_key(pet.pk): pet for pet in pets}
+    versions = cache.get_many(keys)
+    missing = {key: time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    for key, pet in keys.items():
+        pet.card_version = versions[key]
+    return pets
+
+
+def expire_pet(pk):
+    # Adoption state lives on Pet (mark_adopted/mark_available save it), so this also
+    # covers adoption changes.
+    cache.delete_many([_pet_key(pk), SUCCESS_STORIES_KEY])
+    now = time_ns()
+    cache.set_many({PET_LIST_GENERATION_KEY: now, _card_key(pk): now}, timeout=None)
+
+
+def expire_pet_list():
+    # For bulk inserts, which send no post_save for expire_pet to hook into.
+    cache.set(PET_LIST_GENERATION_KEY, time_ns(), timeout=None)
+
+
+def expire_success_stories():
+    cache.delete(SUCCESS_STORIES_KEY)
@@ -0,0 +1,58 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def _etag(request, last_modified, token):
+    # Pages differ per user (nav, owner-only buttons) and embed the CSRF token, so
+    # both are part of the tag; RELEASE changes it when templates are deployed.
+    parts = (
+        settings.RELEASE,
+        request.get_full_path(),
+        request.user.pk,
+        request.META.get('CSRF_COOKIE', ''),
+        last_modified.isoformat() if last_modified else '',
+        token,
+    )
+    return f'"{hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()}"'
+
+
+def conditional_page(version_func):
+    """Answer GET/HEAD with 304 before the view runs when the client's copy is current.
+
+    version_func(request, *args, **kwargs) returns (last_modified, token): the newest
+    change behind the page, or None, and anything else that moves when the page
+    changes but a timestamp cannot show, such as deletes.
+
+    Responses carry `Vary: Cookie` and `no-cache` (plus `private` once logged in), so
+    a shared HTTP cache revalidates every hit and never hands one user's page to another.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            # Pending flash messages are shown once, so that response is never reusable.
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                response = view(request, *args, **kwargs)
+            else:
+                last_modified, token = version_func(request, *args, **kwargs)
+                etag = _etag(request, last_modified, token)
+                timestamp = int(last_modified.timestamp()) if last_modified else None
+                response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                if response.status_code in (200, 304):
+                    response.headers.setdefault('ETag', etag)
+                    if timestamp is not None:
+                        response.headers.setdefault('Last-Modified', http_date(timestamp))
+            patch_vary_headers(response, ('Cookie',))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, no_cache=True)
+            return response
+        return wrapped
+    return decorator
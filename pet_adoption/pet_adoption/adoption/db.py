@@ -0,0 +1,92 @@
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS
+
+READ_ALIAS = 'replica'
+# Run on every new connection. WAL lets readers work while a write is in progress;
+# synchronous=NORMAL is durable with WAL except for the last commits on power loss.
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative means KiB: a 64 MB page cache per connection.
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Seconds a connection waits for the write lock before "database is locked"; this
+# is SQLite's busy timeout.
+BUSY_TIMEOUT = 20
+# Persistent connections, so the pragmas and page cache outlive a single request.
+CONN_MAX_AGE = 600
+
+_read_only = ContextVar('read_only_view', default=False)
+
+
+def sqlite_production(name, read_only=False):
+    """DATABASES entry for one SQLite file in the production profile (Django 5.1+)."""
+    pragmas = dict(PRAGMAS)
+    if read_only:
+        # Switching to WAL writes the file header, which is the writer's job.
+        del pragmas['journal_mode']
+        pragmas['query_only'] = 'ON'
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': BUSY_TIMEOUT,
+            # Take the write lock at BEGIN. A deferred transaction that reads and then
+            # writes fails at once when another writer got in between, busy timeout or not.
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(f'PRAGMA {pragma} = {value}' for pragma, value in pragmas.items()),
+        },
+    }
+    if read_only:
+        # A read connection must never hold the write lock.
+        del config['OPTIONS']['transaction_mode']
+    return config
+
+
+def production_databases(name):
+    return {
+        DEFAULT_DB_ALIAS: sqlite_production(name),
+        READ_ALIAS: {**sqlite_production(name, read_only=True), 'TEST': {'MIRROR': DEFAULT_DB_ALIAS}},
+    }
+
+
+def read_only_view(view):
+    """Send the view's reads to the READ_ALIAS connections via ReadOnlyViewRouter.
+
+    Only for views that never read what they wrote: the read connections are
+    outside the request's transaction.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+
+class ReadOnlyViewRouter:
+    """Reads inside read_only_view go to READ_ALIAS; everything else to the default database.
+
+    Both aliases are the same SQLite file, so relations across them are fine and
+    only the default one is migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        return READ_ALIAS if _read_only.get() else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != READ_ALIAS
@@ -0,0 +1,87 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import AdoptionRequest, Message, SuccessStory
+
+CHUNK_SIZE = 2000
+# Rows are joined into blocks of about this many bytes before being handed to the
+# response, so a million-row export is not a million tiny writes.
+BUFFER_BYTES = 64 * 1024
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+# name -> (model, [(column, lookup)]). Related columns are values_list lookups, which
+# join in the same query select_related would, without building model instances.
+EXPORTS = {
+    'requests': (AdoptionRequest, [
+        ('id', 'id'), ('pet_id', 'pet_id'), ('pet', 'pet__name'), ('owner', 'pet__owner__username'),
+        ('adopter_id', 'adopter_id'), ('adopter', 'adopter__username'), ('status', 'status'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]),
+    'messages': (Message, [
+        ('id', 'id'), ('conversation_id', 'conversation_id'), ('pet_id', 'pet_id'), ('pet', 'pet__name'),
+        ('sender', 'sender__username'), ('receiver', 'receiver__username'), ('content', 'content'),
+        ('is_pinned', 'is_pinned'), ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]),
+    'stories': (SuccessStory, [
+        ('id', 'id'), ('pet_id', 'pet_id'), ('pet', 'pet__name'), ('adopter', 'adopter__username'),
+        ('story', 'story'), ('created_at', 'created_at'),
+    ]),
+}
+EXPORT_NAMES = {model: name for name, (model, _) in EXPORTS.items()}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, so csv.writer can yield lines."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(name, queryset, chunk_size):
+    _, columns = EXPORTS[name]
+    # Primary key order walks the table's own index; the models' default orderings
+    # would make the database sort every row before returning the first one.
+    return queryset.order_by('pk').values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=chunk_size)
+
+
+def _lines(name, queryset, fmt, chunk_size):
+    _, columns = EXPORTS[name]
+    headers = [column for column, _ in columns]
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(headers)
+        for row in _rows(name, queryset, chunk_size):
+            yield writer.writerow(row)
+    else:
+        for row in _rows(name, queryset, chunk_size):
+            yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_lines(name, queryset=None, fmt='csv', chunk_size=CHUNK_SIZE):
+    """Yield the export as str blocks, reading the queryset chunk_size rows at a time."""
+    if queryset is None:
+        queryset = EXPORTS[name][0].objects.all()
+    buffer = []
+    size = 0
+    started = False
+    for line in _lines(name, queryset, fmt, chunk_size):
+        buffer.append(line)
+        size += len(line)
+        # The first line goes out alone so the download starts before the bulk of the work.
+        if size >= BUFFER_BYTES or not started:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+            started = True
+    if buffer:
+        yield ''.join(buffer)
+
+
+def streaming_response(name, queryset=None, fmt='csv'):
+    response = StreamingHttpResponse(export_lines(name, queryset, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{name}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}"'
+    return response
@@ -0,0 +1,61 @@
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Pet
+
+TOP_LOCATIONS = 8
+
+
+def facet_counts(queryset):
+    """The counts every facet is built from, as plain tuples that cache well.
+
+    queryset must not be filtered by pet_type, so one entry serves every type. Each
+    facet dimension is aggregated on its own and locations are cut to TOP_LOCATIONS
+    overall and per type, so the entry stays the same size however many distinct
+    free-text locations there are.
+    """
+    queryset = queryset.order_by()
+    location_ranks = Window(RowNumber(), partition_by=F('pet_type'), order_by=[Count('pk').desc(), F('location').asc()])
+    return {
+        'types': list(
+            queryset.values_list('pet_type')
+            .annotate(total=Count('pk'), adopted=Count('adopted_at'), vaccinated=Count('pk', filter=Q(vaccination_status=True)))
+        ),
+        'locations': list(
+            queryset.values_list('location').annotate(total=Count('pk')).order_by('-total', 'location')[:TOP_LOCATIONS]
+        ),
+        'type_locations': list(
+            queryset.values_list('pet_type', 'location').annotate(total=Count('pk'))
+            .annotate(rank=location_ranks).filter(rank__lte=TOP_LOCATIONS)
+        ),
+    }
+
+
+def pet_facets(counts, pet_type=None):
+    """Counts for the pet_list filter form from facet_counts().
+
+    The type facet always counts every type; the remaining facets follow the
+    selected type.
+    """
+    type_counts = dict.fromkeys((value for value, _ in Pet.PET_TYPES), 0)
+    total = vaccinated = adopted = 0
+    for row_type, row_total, row_adopted, row_vaccinated in counts['types']:
+        type_counts[row_type] = row_total
+        if pet_type and row_type != pet_type:
+            continue
+        total += row_total
+        adopted += row_adopted
+        vaccinated += row_vaccinated
+    if pet_type:
+        locations = [(location, row_total) for row_type, location, row_total, _ in counts['type_locations'] if row_type == pet_type]
+    else:
+        locations = counts['locations']
+    return {
+        'total': total,
+        'pet_types': [(value, label, type_counts[value]) for value, label in Pet.PET_TYPES],
+        'vaccinated': vaccinated,
+        'vaccinated_percent': round(100 * vaccinated / total) if total else 0,
+        'adopted': adopted,
+        'available': total - adopted,
+        'locations': sorted(locations, key=lambda item: (-item[1], item[0])),
+    }
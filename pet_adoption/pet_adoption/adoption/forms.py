@@ -1,12 +1,32 @@
 from django import forms
 from .models import Pet, Message
+from .images import check_dimensions, ImageTooLarge
+from . import perf
+
+class TimedImageField(forms.ImageField):
+    # Opening and verifying the upload is the image work done inside a request;
+    # resizing happens later in process_pet_photos.
+    def to_python(self, data):
+        with perf.timer('image'):
+            return super().to_python(data)
 
 class PetForm(forms.ModelForm):
     class Meta:
         model = Pet
         fields = ['name', 'breed', 'age', 'vaccination_status', 'photo', 'pet_type', 'location']
+        field_classes = {'photo': TimedImageField}
+
+    def clean_photo(self):
+        photo = self.cleaned_data.get('photo')
+        image = getattr(photo, 'image', None)
+        if image is not None:
+            try:
+                check_dimensions(image.width, image.height, image.format)
+            except ImageTooLarge as e:
+                raise forms.ValidationError(str(e))
+        return photo
 
 class MessageForm(forms.ModelForm):
     class Meta:
         model = Message
-        fields = ['content']
\ No newline at end of file
+        fields = ['content']
@@ -0,0 +1,142 @@
+import csv
+import math
+import os
+import re
+from functools import lru_cache
+
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Q, When
+
+from .pagination import encode_cursor, decode_cursor
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gazetteer.csv')
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Pets are bucketed into GRID_DEGREES squares numbered row by row, so the cells of
+# one latitude row are a contiguous range and a radius query is a handful of
+# index range scans instead of one lookup per cell.
+GRID_DEGREES = 0.1
+GRID_COLUMNS = round(360 / GRID_DEGREES)
+MAX_RADIUS_KM = 200
+RADIUS_CHOICES = (5, 10, 25, 50, 100)
+
+_SEPARATORS_RE = re.compile(r'[^\w]+')
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+class UnknownPlace(ValueError):
+    pass
+
+
+def normalize(name):
+    return _SEPARATORS_RE.sub(' ', (name or '').lower()).strip()
+
+
+@lru_cache(maxsize=1)
+def gazetteer():
+    """{normalized name or alias: (latitude, longitude)} from the bundled CSV."""
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            point = (float(row['latitude']), float(row['longitude']))
+            for name in [row['name'], *filter(None, row['aliases'].split('|'))]:
+                places[normalize(name)] = point
+    return places
+
+
+def geocode(location):
+    """(latitude, longitude) for a free-text location, or None if the gazetteer lacks it.
+
+    "Pune", "poona" and "Pune, Maharashtra" all resolve; each comma-separated part
+    is tried in turn after the whole string.
+    """
+    places = gazetteer()
+    for candidate in [location, *(location or '').split(',')]:
+        point = places.get(normalize(candidate))
+        if point:
+            return point
+    return None
+
+
+def cell_for(latitude, longitude):
+    row = math.floor((latitude + 90) / GRID_DEGREES)
+    column = math.floor((longitude + 180) / GRID_DEGREES) % GRID_COLUMNS
+    return row * GRID_COLUMNS + column
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def within_cells(latitude, longitude, radius_km):
+    """Q for pets whose grid cell overlaps the bounding box of the circle.
+
+    A cheap superset: exact distances are only computed for the rows it lets through.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    # Longitude degrees shrink towards the poles; size the box for the widest latitude in it.
+    widest = min(max(abs(latitude - lat_delta), abs(latitude + lat_delta)), 89.9)
+    lon_delta = min(radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest))), 180)
+    first = cell_for(max(latitude - lat_delta, -90), longitude - lon_delta)
+    last = cell_for(min(latitude + lat_delta, 89.999), longitude + lon_delta)
+    first_column, last_column = first % GRID_COLUMNS, last % GRID_COLUMNS
+    if lon_delta >= 180:
+        first_column, last_column = 0, GRID_COLUMNS - 1
+    condition = Q(pk__in=[])
+    for row in range(first // GRID_COLUMNS, last // GRID_COLUMNS + 1):
+        base = row * GRID_COLUMNS
+        if first_column <= last_column:
+            condition |= Q(geo_cell__range=(base + first_column, base + last_column))
+        else:
+            # The box crosses the antimeridian.
+            condition |= Q(geo_cell__range=(base + first_column, base + GRID_COLUMNS - 1))
+            condition |= Q(geo_cell__range=(base, base + last_column))
+    return condition
+
+
+def approximate_distance_sq(latitude, longitude):
+    """Squared equirectangular distance from the point in km², as a database expression.
+
+    Plain arithmetic every backend can filter and sort by, and close to the
+    great-circle distance at the radii offered.
+    """
+    km_per_lon_degree = KM_PER_DEGREE * math.cos(math.radians(latitude))
+    # Points across the antimeridian, moved next to the search point.
+    pet_longitude = Case(
+        When(longitude__lt=longitude - 180, then=F('longitude') + 360.0),
+        When(longitude__gt=longitude + 180, then=F('longitude') - 360.0),
+        default=F('longitude'),
+    )
+    dx = (pet_longitude - longitude) * km_per_lon_degree
+    dy = (F('latitude') - latitude) * KM_PER_DEGREE
+    return ExpressionWrapper(dx * dx + dy * dy, output_field=FloatField())
+
+
+def nearby_page(queryset, latitude, longitude, radius_km, cursor=None, page_size=24):
+    """Pets within radius_km, nearest first: returns (items, next_cursor) like keyset_page.
+
+    The grid cells bound the scan and the database filters, orders and pages on
+    approximate_distance_sq() with a (distance, id) keyset, so only one page of rows
+    reaches Python. Each item gets a great-circle distance_km attribute.
+    """
+    queryset = (
+        queryset.filter(within_cells(latitude, longitude, radius_km))
+        .annotate(distance_sq=approximate_distance_sq(latitude, longitude))
+        .filter(distance_sq__lte=radius_km ** 2)
+        .order_by('distance_sq', 'id')
+    )
+    if cursor:
+        distance_sq, pk = decode_cursor(cursor, parse_key=float)
+        queryset = queryset.filter(Q(distance_sq__gt=distance_sq) | Q(distance_sq=distance_sq, id__gt=pk))
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1].distance_sq, items[-1].pk)
+    for pet in items:
+        pet.distance_km = haversine_km(latitude, longitude, pet.latitude, pet.longitude)
+    return items, next_cursor
@@ -0,0 +1,144 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Pet
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each size; aspect ratio is always preserved.
+VARIANTS = {
+    'thumb': 200,
+    'card': 400,
+    'full': 1200,
+}
+# Memory bounds for decoding uploads. JPEGs are decoded in draft mode (DCT scaling
+# at 1/2, 1/4 or 1/8) straight to about twice the largest variant, so a 40 MP phone
+# photo decodes to a few MP. Other formats must be fully decoded once, so they get
+# a lower pixel limit. Together this keeps peak decode memory per photo under
+# PEAK_MEMORY_BUDGET, which adoption.tests.BoundedDecodeTests checks.
+MAX_UPLOAD_PIXELS = 50_000_000
+MAX_FULL_DECODE_PIXELS = 12_000_000
+PEAK_MEMORY_BUDGET = 64 * 1024 * 1024
+
+Image.MAX_IMAGE_PIXELS = MAX_UPLOAD_PIXELS
+
+FORMATS = {
+    'jpeg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def check_dimensions(width, height, image_format):
+    limit = MAX_UPLOAD_PIXELS if image_format == 'JPEG' else MAX_FULL_DECODE_PIXELS
+    if width * height > limit:
+        raise ImageTooLarge(f"{width}x{height} {image_format} exceeds the {limit // 1_000_000} MP limit.")
+
+
+def open_bounded(source):
+    """Open and decode an image at no more than about twice the largest variant size.
+
+    Applies the EXIF orientation so sideways phone photos come out upright.
+    """
+    image = Image.open(source)
+    check_dimensions(image.width, image.height, image.format)
+    longest = max(VARIANTS.values())
+    scale = longest / max(image.size)
+    if image.format == 'JPEG' and scale < 1:
+        image.draft('RGB', (max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+    factor = max(image.size) // longest
+    if factor >= 2:
+        image = image.reduce(factor)
+    # After reduce(): transposing a full-size PNG would hold two full-size copies at once.
+    ImageOps.exif_transpose(image, in_place=True)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+def render_variants(source):
+    """Resize an image file path or raw bytes into every size and format.
+
+    Runs in a worker process, so it touches no ORM or storage.
+    Returns {name: {'width': w, 'height': h, 'jpeg': bytes, 'webp': bytes}}.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    image = open_bounded(source)
+    rendered = {}
+    # Largest first, each size resampled from the previous one.
+    for name, edge in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        entry = {'width': image.width, 'height': image.height}
+        for fmt, (pil_format, _, options) in FORMATS.items():
+            output = BytesIO()
+            image.save(output, format=pil_format, **options)
+            entry[fmt] = output.getvalue()
+        rendered[name] = entry
+    return rendered
+
+
+def store_variants(pet, rendered):
+    # The photo storage names files by content hash, so re-rendering identical
+    # output reuses the existing files and URLs never change meaning.
+    variants = {}
+    for name, entry in rendered.items():
+        variants[name] = {'width': entry['width'], 'height': entry['height']}
+        for fmt, (_, ext, _) in FORMATS.items():
+            variants[name][fmt] = pet.photo.storage.save(f"pets/variants/{name}.{ext}", ContentFile(entry[fmt]))
+    pet.photo_variants = variants
+    pet.save(update_fields=['photo_variants', 'updated_at'])
+
+
+def _source(pet):
+    # Hand workers a filesystem path when there is one so the compressed file is
+    # never held in memory by the parent process.
+    try:
+        return pet.photo.path
+    except NotImplementedError:
+        with pet.photo.open('rb') as f:
+            return f.read()
+
+
+def _record_failure(pet, error):
+    logger.error(f"Error processing photo for pet {pet.pk}: {error}")
+    pet.photo_variants = {'error': str(error)}
+    pet.save(update_fields=['photo_variants', 'updated_at'])
+
+
+def process_pets(pets, workers=None):
+    """Render variants for pets in a process pool and record them. Returns (done, failed).
+
+    Pets whose photo cannot be decoded get an 'error' entry so the worker does not
+    pick them up again; the listing keeps showing the placeholder for them.
+    """
+    pets = [pet for pet in pets if pet.photo]
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = []
+        for pet in pets:
+            try:
+                futures.append((pet, pool.submit(render_variants, _source(pet))))
+            except OSError as e:
+                _record_failure(pet, e)
+                failed += 1
+        for pet, future in futures:
+            try:
+                store_variants(pet, future.result())
+                done += 1
+            except Exception as e:
+                _record_failure(pet, e)
+                failed += 1
+    return done, failed
+
+
+def pending_pets():
+    return Pet.objects.exclude(photo='').filter(photo_variants={})
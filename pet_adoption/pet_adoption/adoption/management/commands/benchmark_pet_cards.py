@@ -0,0 +1,56 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+
+from adoption import caching
+from adoption.models import Pet
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering pet listing cards with a cold and a warm fragment cache. Test data is rolled back "
+        "and the cards are cached in a private local-memory cache, so the real one is left alone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help="Number of cards on the page.")
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Expiring the test pets moves the pet-list generation, which would empty every cached
+        # list page, and their card keys would outlive the rollback for pks SQLite hands out again.
+        isolated = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-pet-cards'}}
+        with override_settings(CACHES=isolated), transaction.atomic():
+            owner = User.objects.create_user(f'card-benchmark-{time.time_ns()}')
+            Pet.objects.bulk_create(
+                Pet(name=f'Pet {i}', breed='Mixed', age=i % 15, pet_type='dog', location='Pune', owner=owner)
+                for i in range(options['count'])
+            )
+            pets = list(Pet.objects.filter(owner=owner))
+            request = RequestFactory().get('/pets/')
+            request.user = owner
+            cold = [self.render(request, pets, expire=True) for _ in range(options['runs'])]
+            warm = [self.render(request, pets, expire=False) for _ in range(options['runs'])]
+            transaction.set_rollback(True)
+        cold_ms, warm_ms = statistics.median(cold), statistics.median(warm)
+        self.stdout.write(
+            f"{options['count']} cards, median of {options['runs']} runs: "
+            f"cold {cold_ms:.1f} ms, warm {warm_ms:.1f} ms ({cold_ms / warm_ms:.1f}x faster warm)"
+        )
+
+    def render(self, request, pets, expire):
+        if expire:
+            for pet in pets:
+                caching.expire_pet(pet.pk)
+        started = time.perf_counter()
+        render_to_string('pet_list.html', {
+            'pets': caching.attach_card_versions(pets),
+            'card_cache_seconds': caching.PET_CARD_CACHE_SECONDS,
+            'pet_types': Pet.PET_TYPES,
+        }, request=request)
+        return (time.perf_counter() - started) * 1000
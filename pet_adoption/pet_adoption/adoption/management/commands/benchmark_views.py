@@ -0,0 +1,208 @@
+import json
+import math
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from accounts import urls as account_urls
+from adoption import urls as adoption_urls
+from adoption.models import AdoptionRequest, Conversation, Message, Pet, SuccessStory
+
+URLCONFS = [adoption_urls, account_urls]
+# Who requests each URL; anything not listed is requested by the pet owner.
+ROLES = {
+    'adoption:apply_adoption': 'adopter',
+    'adoption:analytics_dashboard': 'staff',
+    'accounts:register': None,
+    'accounts:login': None,
+    'accounts:forgot_password': None,
+    'accounts:reset_password': None,
+}
+# Query strings timed as separate rows, for views whose cost depends on the filters.
+VARIANTS = {
+    'adoption:pet_list': ['', 'pet_type=dog', 'q=indie', 'near=Pune'],
+    'adoption:pet_list_json': ['', 'pet_type=cat'],
+}
+# Views whose pk is an adoption request; everywhere else pk is a pet.
+REQUEST_VIEWS = {'adoption:approve_adoption', 'adoption:reject_adoption'}
+SKIP = {
+    'adoption:message_stream': "server-sent events: the response only ends when the client disconnects",
+}
+
+
+@dataclass
+class Target:
+    name: str
+    path: str
+    user: User = None
+    # logout ends the session it is timed with.
+    relogin: bool = False
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every URL in adoption/urls.py and accounts/urls.py through the test client from concurrent "
+        "workers and report latency percentiles, throughput and query counts as JSON. Run seed_scale first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help="Timed requests per URL, split across the workers.")
+        parser.add_argument('--workers', type=int, default=4, help="Concurrent clients, one thread and connection each.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per worker before timing starts.")
+        parser.add_argument('--only', nargs='*', help="URL names to run, e.g. adoption:pet_list.")
+        parser.add_argument('--conversation', type=int, help="Conversation whose pet, owner and adopter are used. Default: the first one with messages.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        targets, skipped = self.targets(options['only'], options['conversation'])
+        results = []
+        # GET-only: state-changing views are timed on the page they render or redirect to.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for target in targets:
+                results.append(self.run(target, options['requests'], options['workers'], options['warmup']))
+                if options['output']:
+                    latency = results[-1]['latency_ms']
+                    self.stdout.write(
+                        f"{target.name:<40} p50 {latency['p50']:8.1f} ms  p99 {latency['p99']:8.1f} ms  "
+                        f"{results[-1]['throughput_rps']:7.1f} req/s  {results[-1]['queries']['max']} queries"
+                    )
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'release': settings.RELEASE,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'workers': options['workers'],
+            'requests_per_url': options['requests'],
+            'rows': {model.__name__: model.objects.count() for model in (User, Pet, AdoptionRequest, Conversation, Message, SuccessStory)},
+            'results': results,
+            'skipped': skipped,
+        }
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(text + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        else:
+            self.stdout.write(text)
+
+    def targets(self, only, conversation_id=None):
+        conversations = Conversation.objects.filter(last_message__isnull=False).select_related('pet', 'owner', 'adopter')
+        if conversation_id:
+            conversations = conversations.filter(pk=conversation_id)
+        conversation = conversations.order_by('pk').first()
+        if conversation is None:
+            raise CommandError("No conversation with messages to benchmark; run seed_scale first.")
+        users = {
+            'owner': conversation.owner,
+            'adopter': conversation.adopter,
+            'staff': User.objects.filter(is_staff=True).order_by('pk').first(),
+            None: None,
+        }
+        message = conversation.messages.filter(sender=conversation.owner).order_by('pk').first() or conversation.last_message
+        request = AdoptionRequest.objects.filter(pet=conversation.pet).order_by('pk').first()
+        # Logging in changes a user's reset tokens, so the reset link belongs to someone who never does.
+        bystander = User.objects.exclude(pk__in=[user.pk for user in users.values() if user]).order_by('pk').first() or conversation.adopter
+        values = {
+            'pet_pk': conversation.pet.pk,
+            'pet_id': conversation.pet.pk,
+            'message_id': message.pk,
+            'user_id': bystander.pk,
+            'token': default_token_generator.make_token(bystander),
+        }
+        targets, skipped = [], []
+        for urls in URLCONFS:
+            for pattern in urls.urlpatterns:
+                if not isinstance(pattern, URLPattern):
+                    continue
+                name = f'{urls.app_name}:{pattern.name}'
+                if only and name not in only:
+                    continue
+                if name in SKIP:
+                    skipped.append({'name': name, 'reason': SKIP[name]})
+                    continue
+                role = ROLES.get(name, 'owner')
+                if role and users[role] is None:
+                    skipped.append({'name': name, 'reason': f"no {role} user"})
+                    continue
+                kwargs = {}
+                for param in pattern.pattern.converters:
+                    kwargs[param] = request.pk if param == 'pk' and name in REQUEST_VIEWS else values.get(param, conversation.pet.pk)
+                path = reverse(name, kwargs=kwargs)
+                for query in VARIANTS.get(name, ['']):
+                    targets.append(Target(
+                        f'{name}?{query}' if query else name, f'{path}?{query}' if query else path,
+                        users[role], relogin=pattern.name == 'logout',
+                    ))
+        return targets, skipped
+
+    def run(self, target, requests, workers, warmup):
+        shares = [requests // workers + (i < requests % workers) for i in range(workers)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            samples = [sample for share in pool.map(lambda count: self.worker(target, count, warmup), shares) for sample in share]
+        elapsed = time.perf_counter() - started
+        latencies = sorted(ms for ms, _, _ in samples)
+        queries = [count for _, count, _ in samples]
+        statuses = {}
+        for _, _, status in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            'name': target.name,
+            'path': target.path,
+            'user': target.user.username if target.user else None,
+            'requests': len(samples),
+            'errors': sum(count for status, count in statuses.items() if int(status) >= 500),
+            'status': statuses,
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'mean': round(statistics.fmean(latencies), 2),
+                'max': round(latencies[-1], 2),
+            },
+            # Includes the warmup requests' share of the wall time, as any client would see it.
+            'throughput_rps': round(len(samples) / elapsed, 1),
+            'queries': {'mean': round(statistics.fmean(queries), 2), 'max': max(queries)},
+        }
+
+    def worker(self, target, count, warmup):
+        """Time count requests on one client and connection; returns [(ms, queries, status)]."""
+        client = Client(raise_request_exception=False)
+        samples = []
+        try:
+            if target.user:
+                client.force_login(target.user)
+            for i in range(warmup + count):
+                if target.relogin:
+                    client.force_login(target.user)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = client.get(target.path)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    ms = (time.perf_counter() - started) * 1000
+                response.close()
+                if i >= warmup:
+                    samples.append((ms, len(captured), response.status_code))
+        finally:
+            connection.close()
+        return samples
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from adoption import exports
+
+
+class Command(BaseCommand):
+    help = "Stream adoption requests, messages or success stories to a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout).")
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        blocks = exports.export_lines(options['name'], fmt=options['format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as f:
+                f.writelines(blocks)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+        else:
+            for block in blocks:
+                self.stdout.write(block, ending='')
@@ -0,0 +1,152 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from itertools import islice
+from urllib.request import urlopen
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from adoption import caching, search
+from adoption.forms import PetForm
+from adoption.images import check_dimensions
+from adoption.models import ImportCheckpoint, Pet
+
+MAX_PHOTO_BYTES = 20 * 1024 * 1024
+PHOTO_TIMEOUT = 10
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def read_rows(path, fmt):
+    """Yield (line number, row dict) one at a time, so memory stays flat for any file size.
+
+    A JSON Lines row that does not parse is yielded as its ValueError, for build_pets to reject.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except ValueError as e:
+                        row = e
+                    yield line_number, row
+
+
+def fetch_photo(source, photo_root):
+    """Download or read one photo and store it; returns the stored name."""
+    if source.startswith(('http://', 'https://')):
+        with urlopen(source, timeout=PHOTO_TIMEOUT) as response:
+            data = response.read(MAX_PHOTO_BYTES + 1)
+    else:
+        with open(os.path.join(photo_root, source), 'rb') as f:
+            data = f.read(MAX_PHOTO_BYTES + 1)
+    if len(data) > MAX_PHOTO_BYTES:
+        raise ValueError(f"larger than {MAX_PHOTO_BYTES // (1024 * 1024)} MB")
+    # Reads the header only; the variants are rendered later by process_pet_photos.
+    image = Image.open(BytesIO(data))
+    check_dimensions(image.width, image.height, image.format)
+    name = os.path.basename(source.split('?')[0]) or 'photo.jpg'
+    return Pet._meta.get_field('photo').storage.save(f"pets/{name}", ContentFile(data))
+
+
+class Command(BaseCommand):
+    help = "Import pets from a CSV or JSON Lines file, validating each row with PetForm."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--owner', required=True, help="Username that will own the imported pets.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Default: from the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows inserted per transaction.")
+        parser.add_argument('--workers', type=int, default=8, help="Threads fetching photos.")
+        parser.add_argument('--photo-root', default='.', help="Directory that relative photo paths are read from.")
+        parser.add_argument('--checkpoint', help="Name of the checkpoint row. Default: the absolute path of the file.")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint and start over.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        try:
+            self.owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['owner']!r}.")
+        self.photo_root = options['photo_root']
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=options['checkpoint'] or os.path.abspath(path))
+        if options['restart']:
+            checkpoint.line = checkpoint.imported = checkpoint.failed = 0
+        elif checkpoint.line:
+            self.stdout.write(f"Resuming after line {checkpoint.line} ({checkpoint.imported} imported so far).")
+
+        rows = ((line, row) for line, row in read_rows(path, fmt) if line > checkpoint.line)
+        started = time.monotonic()
+        processed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while batch := list(islice(rows, options['batch_size'])):
+                pets, failed = self.build_pets(batch, pool)
+                checkpoint.line = batch[-1][0]
+                checkpoint.imported += len(pets)
+                checkpoint.failed += failed
+                # One transaction with the rows, so a rerun after a crash starts from the
+                # first batch that did not commit and never inserts a row twice.
+                with transaction.atomic():
+                    Pet.objects.bulk_create(pets)
+                    if search.is_available():
+                        search.index_pets(pets)
+                    checkpoint.save()
+                # bulk_create sends no post_save, so the signal-driven cache expiry never runs.
+                # Per batch, so the batches of a run that crashes later are expired too.
+                caching.expire_pet_list()
+                caching.expire_dashboards([self.owner.pk])
+                processed += len(batch)
+                rate = processed / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(f"Line {checkpoint.line}: {checkpoint.imported} imported, {checkpoint.failed} rejected, {rate:.0f} rows/s")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {checkpoint.imported} pets, rejected {checkpoint.failed} rows "
+            f"({processed / max(elapsed, 1e-6):.0f} rows/s over {elapsed:.1f}s)."
+        ))
+
+    def build_pets(self, batch, pool):
+        """Validate a batch and fetch its photos in the pool. Returns (unsaved pets, rejected rows)."""
+        valid = []
+        failed = 0
+        for line, row in batch:
+            if not isinstance(row, dict):
+                self.stderr.write(f"Line {line}: {f'invalid JSON: {row}' if isinstance(row, ValueError) else 'not a JSON object'}")
+                failed += 1
+                continue
+            data = {name: row.get(name) for name in PetForm._meta.fields if name != 'photo'}
+            if isinstance(data['vaccination_status'], str):
+                data['vaccination_status'] = data['vaccination_status'].strip().lower() in TRUE_VALUES
+            form = PetForm(data)
+            if not form.is_valid():
+                errors = '; '.join(f"{field}: {' '.join(messages)}" for field, messages in form.errors.items())
+                self.stderr.write(f"Line {line}: {errors}")
+                failed += 1
+                continue
+            pet = form.save(commit=False)
+            pet.owner = self.owner
+            # bulk_create skips Pet.save, which normally does this.
+            pet.geocode()
+            valid.append((line, pet, str(row.get('photo') or '').strip()))
+
+        photos = {line: pool.submit(fetch_photo, source, self.photo_root) for line, _, source in valid if source}
+        for line, pet, _ in valid:
+            if line in photos:
+                try:
+                    pet.photo = photos[line].result()
+                except Exception as e:
+                    # The listing is still useful without its photo; the owner can add one later.
+                    self.stderr.write(f"Line {line}: photo skipped: {e}")
+        return [pet for _, pet, _ in valid], failed
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from adoption import images
+
+
+class Command(BaseCommand):
+    help = "Render thumbnail/card/full JPEG and WebP variants for pet photos in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new uploads instead of exiting.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls in --loop mode.")
+
+    def handle(self, *args, **options):
+        total_done = total_failed = 0
+        while True:
+            batch = list(images.pending_pets().order_by('id')[:options['batch_size']])
+            if batch:
+                done, failed = images.process_pets(batch, options['workers'])
+                total_done += done
+                total_failed += failed
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total_done} photos, {total_failed} failed."))
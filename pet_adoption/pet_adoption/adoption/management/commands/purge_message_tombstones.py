@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from adoption.models import MessageTombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete message tombstones older than MESSAGE_TOMBSTONE_DAYS in batches. Clients syncing from an "
+        "older cursor get a full resync instead. Run it daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.MESSAGE_TOMBSTONE_DAYS)
+        expired = MessageTombstone.objects.filter(deleted_at__lt=cutoff)
+        deleted = 0
+        while ids := list(expired.values_list('id', flat=True)[:options['batch_size']]):
+            deleted += MessageTombstone.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} message tombstones."))
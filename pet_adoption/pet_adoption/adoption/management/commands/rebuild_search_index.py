@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from adoption import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the FTS5 pet and message search indexes from their tables."
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Full-text search needs the SQLite backend.")
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} pets."))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from adoption import caching
+from adoption.models import Pet
+from adoption.storage import is_hashed_name, photo_storage
+
+
+class Command(BaseCommand):
+    help = "Move existing pet photos and variants to content-addressed names, merging duplicates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', help="Leave the old files on disk.")
+
+    def rehash(self, name, stale):
+        if is_hashed_name(name):
+            return name
+        if not photo_storage.exists(name):
+            self.stderr.write(f"Missing file {name}, left as is.")
+            return name
+        with photo_storage.open(name, 'rb') as f:
+            new_name = photo_storage.save(name, f)
+        stale.add(name)
+        return new_name
+
+    def handle(self, *args, **options):
+        stale = set()
+        pets = 0
+        for pet in Pet.objects.exclude(photo='').iterator():
+            photo_name = self.rehash(pet.photo.name, stale)
+            variants = {}
+            for size, variant in pet.photo_variants.items():
+                if not isinstance(variant, dict):
+                    variants[size] = variant
+                    continue
+                variants[size] = {
+                    key: self.rehash(value, stale) if key in ('jpeg', 'webp') else value
+                    for key, value in variant.items()
+                }
+            if photo_name != pet.photo.name or variants != pet.photo_variants:
+                # update() sends no post_save: bump updated_at for the detail ETags and expire the
+                # cached pet, its cards and the list pages before the old files are deleted.
+                Pet.objects.filter(pk=pet.pk).update(photo=photo_name, photo_variants=variants, updated_at=timezone.now())
+                caching.expire_pet(pet.pk)
+                pets += 1
+        removed = 0
+        if not options['keep_originals']:
+            for name in stale:
+                if not Pet.objects.filter(photo=name).exists():
+                    photo_storage.delete(name)
+                    removed += 1
+        self.stdout.write(self.style.SUCCESS(f"Rehashed {pets} pets ({len(stale)} files), removed {removed} old files."))
@@ -0,0 +1,165 @@
+import csv
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from adoption import caching, geo, search
+from adoption.models import AdoptionRequest, Conversation, Message, Pet, SuccessStory
+
+BREEDS = ['Labrador', 'Indie', 'Beagle', 'Persian', 'Siamese', 'Pug', 'Mixed', 'Shih Tzu', 'Lop', 'Budgie', 'Goldfish']
+WORDS = (
+    'hello is she still available we would love to meet him this weekend vaccinated friendly '
+    'with kids and other pets how old food walks garden flat visit thanks sure evening morning'
+).split()
+
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative weights where the item at rank r is drawn about 1 / r**exponent as often as the first."""
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic users, pets, adoption requests, conversations, messages and "
+        "success stories, skewed the way real traffic is: a few busy owners, popular pets and chatty conversations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--pets', type=int, default=10_000)
+        parser.add_argument('--requests', type=int, default=30_000)
+        parser.add_argument('--messages', type=int, default=100_000)
+        parser.add_argument('--stories', type=int, default=1000, help="Adopted pets, each with an approved request, a conversation and a story.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix; seeded users log in with --password.")
+        parser.add_argument('--password', default='seed-pass')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError("--users must be at least 2: adopters cannot adopt their own pets.")
+        if options['stories'] > options['pets']:
+            raise CommandError("--stories cannot exceed --pets.")
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Users named {options['prefix']}* already exist; pass another --prefix.")
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+        with transaction.atomic():
+            users = self.create_users(options['users'], options['prefix'], options['password'])
+            pets = self.create_pets(users, options['pets'], options['stories'])
+            self.create_requests(users, pets, options['requests'])
+            conversations = self.create_stories(pets)
+            self.create_messages(conversations, options['messages'])
+        # bulk_create sends no signals, so nothing expired these.
+        caching.expire_pet_list()
+        caching.expire_success_stories()
+        caching.expire_dashboards([user.pk for user in users])
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(pets)} pets, {options['requests']} requests, "
+            f"{len(conversations)} conversations and {options['messages']} messages in {time.monotonic() - started:.1f}s."
+        ))
+
+    def bulk_create(self, model, objects):
+        created = []
+        for start in range(0, len(objects), self.batch_size):
+            created += model.objects.bulk_create(objects[start:start + self.batch_size])
+        return created
+
+    def create_users(self, count, prefix, password):
+        # Hashing is deliberately slow; every seeded user shares one hash.
+        hashed = make_password(password)
+        # The first user is staff, so benchmark_views can reach the analytics dashboard.
+        return self.bulk_create(User, [
+            User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=hashed, is_staff=i == 0)
+            for i in range(count)
+        ])
+
+    def create_pets(self, users, count, adopted):
+        with open(geo.GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+            places = [row['name'] for row in csv.DictReader(f)]
+        owners = self.rng.choices(users, cum_weights=zipf_weights(len(users)), k=count)
+        locations = self.rng.choices(places, cum_weights=zipf_weights(len(places)), k=count)
+        types = self.rng.choices([value for value, _ in Pet.PET_TYPES], cum_weights=zipf_weights(len(Pet.PET_TYPES), 1.5), k=count)
+        pets = []
+        for i in range(count):
+            pet = Pet(
+                name=f'Pet {i}', breed=self.rng.choice(BREEDS), age=self.rng.randint(0, 15), pet_type=types[i],
+                location=locations[i], owner=owners[i], vaccination_status=self.rng.random() < 0.7,
+            )
+            pet.geocode()
+            pets.append(pet)
+        for pet in self.rng.sample(pets, adopted):
+            pet.adopter = self.other_user(users, pet.owner)
+            pet.adopted_at = timezone.now()
+        pets = self.bulk_create(Pet, pets)
+        if search.is_available():
+            search.index_pets(pets)
+        return pets
+
+    def other_user(self, users, excluded):
+        while (user := self.rng.choice(users)) == excluded:
+            pass
+        return user
+
+    def create_requests(self, users, pets, count):
+        # The most popular listings collect most of the requests.
+        popular = self.rng.sample(pets, len(pets))
+        chosen = self.rng.choices(popular, cum_weights=zipf_weights(len(popular)), k=count)
+        self.bulk_create(AdoptionRequest, [
+            AdoptionRequest(pet=pet, adopter=self.other_user(users, pet.owner), status=self.rng.choice(['pending', 'pending', 'rejected']))
+            for pet in chosen
+        ])
+
+    def create_stories(self, pets):
+        adopted = [pet for pet in pets if pet.adopter_id]
+        self.bulk_create(AdoptionRequest, [AdoptionRequest(pet=pet, adopter_id=pet.adopter_id, status='approved') for pet in adopted])
+        self.bulk_create(SuccessStory, [
+            SuccessStory(pet=pet, adopter_id=pet.adopter_id, story=f'{pet.name} settled in with a new family.')
+            for pet in adopted
+        ])
+        return self.bulk_create(Conversation, [
+            Conversation(pet=pet, owner_id=pet.owner_id, adopter_id=pet.adopter_id) for pet in adopted
+        ])
+
+    def create_messages(self, conversations, count):
+        if not conversations:
+            return
+        # Shuffled first, so the chattiest conversations are not simply the oldest ones.
+        chatty = self.rng.sample(conversations, len(conversations))
+        chosen = self.rng.choices(chatty, cum_weights=zipf_weights(len(chatty)), k=count)
+        for start in range(0, count, self.batch_size):
+            messages = []
+            for conversation in chosen[start:start + self.batch_size]:
+                sender, receiver = conversation.owner_id, conversation.adopter_id
+                if self.rng.random() < 0.5:
+                    sender, receiver = receiver, sender
+                messages.append(Message(
+                    conversation=conversation, pet_id=conversation.pet_id, sender_id=sender, receiver_id=receiver,
+                    content=' '.join(self.rng.choices(WORDS, k=self.rng.randint(3, 20))),
+                    is_pinned=self.rng.random() < 0.01,
+                ))
+            messages = Message.objects.bulk_create(messages)
+            if search.is_available():
+                search.index_messages(messages)
+        # Message.save keeps these up to date one message at a time; set them once here.
+        # History counts as read, as in the conversation backfill.
+        latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+        pinned = (
+            Message.objects.filter(conversation=OuterRef('pk'), is_pinned=True).order_by()
+            .values('conversation').annotate(count=Count('pk')).values('count')
+        )
+        # One transaction of bulk inserts, so this run's conversations have consecutive ids.
+        Conversation.objects.filter(pk__range=(conversations[0].pk, conversations[-1].pk)).update(
+            last_message=Subquery(latest.values('pk')[:1]),
+            last_message_at=Subquery(latest.values('created_at')[:1]),
+            pinned_count=Coalesce(Subquery(pinned), 0),
+        )
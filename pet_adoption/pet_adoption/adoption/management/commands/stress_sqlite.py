@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+from adoption.db import sqlite_production
+
+PROFILES = {
+    # What settings.DATABASES gives without DATABASE_PROFILE.
+    'development': lambda name: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name},
+    'production': sqlite_production,
+}
+SCHEMA = [
+    "CREATE TABLE stress_request (id INTEGER PRIMARY KEY, pet_id INTEGER NOT NULL, adopter_id INTEGER NOT NULL)",
+    "CREATE TABLE stress_outbox (id INTEGER PRIMARY KEY, body TEXT NOT NULL)",
+    "CREATE INDEX stress_request_pet ON stress_request (pet_id)",
+]
+
+
+@contextmanager
+def scratch_database(alias, config):
+    """Register a database alias for the duration of the block."""
+    connections.settings[alias] = connections.configure_settings({DEFAULT_DB_ALIAS: config})[DEFAULT_DB_ALIAS]
+    try:
+        yield
+    finally:
+        connections[alias].close()
+        del connections.settings[alias]
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer a scratch SQLite file with concurrent adoption-request style transactions (read, then two "
+        "inserts) under the development and production database profiles and report lock errors as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=list(PROFILES), action='append', help="Default: all profiles.")
+        parser.add_argument('--writers', type=int, default=16, help="Threads running write transactions.")
+        parser.add_argument('--readers', type=int, default=4, help="Threads reading while the writers run.")
+        parser.add_argument('--transactions', type=int, default=50, help="Write transactions per writer.")
+
+    def handle(self, *args, **options):
+        results = []
+        for profile in options['profile'] or list(PROFILES):
+            with tempfile.TemporaryDirectory() as directory:
+                alias = f'stress_{profile}'
+                with scratch_database(alias, PROFILES[profile](os.path.join(directory, 'stress.sqlite3'))):
+                    results.append(self.run(alias, profile, options['writers'], options['readers'], options['transactions']))
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run(self, alias, profile, writers, readers, transactions):
+        with connections[alias].cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+        done = threading.Event()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers + readers) as pool:
+            reads = [pool.submit(self.reader, alias, done) for _ in range(readers)]
+            writes = [pool.submit(self.writer, alias, worker, transactions) for worker in range(writers)]
+            outcomes = [future.result() for future in writes]
+            done.set()
+            read_outcomes = [future.result() for future in reads]
+        elapsed = time.perf_counter() - started
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM stress_request")
+            rows = cursor.fetchone()[0]
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+        committed = sum(ok for ok, _ in outcomes)
+        return {
+            'profile': profile,
+            'journal_mode': journal_mode,
+            'writers': writers,
+            'readers': readers,
+            'attempted': writers * transactions,
+            'committed': committed,
+            'lock_errors': sum(locked for _, locked in outcomes),
+            # Each committed transaction inserts exactly one request row.
+            'consistent': rows == committed,
+            'reads': sum(ok for ok, _ in read_outcomes),
+            'read_lock_errors': sum(locked for _, locked in read_outcomes),
+            'seconds': round(elapsed, 2),
+            'commits_per_second': round(committed / elapsed, 1),
+        }
+
+    def writer(self, alias, worker, transactions):
+        committed = locked = 0
+        try:
+            for i in range(transactions):
+                pet_id = i % 10
+                try:
+                    # Like apply_adoption: look the pet up, then write the request and its email.
+                    with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                        cursor.execute("SELECT count(*) FROM stress_request WHERE pet_id = %s", [pet_id])
+                        cursor.fetchone()
+                        cursor.execute("INSERT INTO stress_request (pet_id, adopter_id) VALUES (%s, %s)", [pet_id, worker])
+                        cursor.execute("INSERT INTO stress_outbox (body) VALUES (%s)", [f'request from {worker}'])
+                    committed += 1
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    locked += 1
+        finally:
+            connections[alias].close()
+        return committed, locked
+
+    def reader(self, alias, done):
+        reads = locked = 0
+        try:
+            while not done.is_set():
+                try:
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute("SELECT pet_id, count(*) FROM stress_request GROUP BY pet_id")
+                        cursor.fetchall()
+                    reads += 1
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    locked += 1
+        finally:
+            connections[alias].close()
+        return reads, locked
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from adoption import analytics
+
+
+class Command(BaseCommand):
+    help = "Fold pets and adoption requests changed since the last run into the daily analytics rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Drop the rollups and recompute every day from scratch.")
+        parser.add_argument('--loop', action='store_true', help="Keep updating instead of exiting after one pass.")
+        parser.add_argument('--interval', type=float, default=60.0, help="Seconds to sleep between passes in --loop mode.")
+
+    def handle(self, *args, **options):
+        rebuild = options['rebuild']
+        while True:
+            started = time.monotonic()
+            touched = analytics.update_rollups(rebuild=rebuild)
+            rebuild = False
+            summary = ', '.join(f"{source}: {days} day(s)" for source, days in touched.items())
+            self.stdout.write(self.style.SUCCESS(f"Recomputed {summary} in {time.monotonic() - started:.2f}s."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.21 on 2026-10-18 08:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_adoption_state(apps, schema_editor):
+    """Fill adopter and adopted_at from the first approved request of each pet.
+
+    Requests do not record when they were approved. Approving one has always created
+    an "Adoption approved!" success story, so adopted_at is that story's created_at.
+    Only when the story has been deleted does it fall back to the request's created_at,
+    which is when the adopter applied and so earlier than the real adoption.
+    """
+    Pet = apps.get_model('adoption', 'Pet')
+    AdoptionRequest = apps.get_model('adoption', 'AdoptionRequest')
+    SuccessStory = apps.get_model('adoption', 'SuccessStory')
+    approved = AdoptionRequest.objects.filter(status='approved').order_by('pet_id', 'created_at')
+    seen = set()
+    for adoption_request in approved.iterator():
+        if adoption_request.pet_id in seen:
+            continue
+        seen.add(adoption_request.pet_id)
+        story = (
+            SuccessStory.objects.filter(
+                pet_id=adoption_request.pet_id, adopter_id=adoption_request.adopter_id,
+                created_at__gte=adoption_request.created_at,
+            )
+            .order_by('created_at').first()
+        )
+        Pet.objects.filter(pk=adoption_request.pet_id).update(
+            adopter_id=adoption_request.adopter_id,
+            adopted_at=story.created_at if story else adoption_request.created_at,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0007_remove_successstory_photo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='adopted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='adopter',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='adopted_pets', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_adoption_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.21 on 2026-10-18 09:10
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS adoption_pet_fts "
+        "USING fts5(name, breed, location, pet_type, prefix='2 3')"
+    )
+    schema_editor.execute(
+        "INSERT INTO adoption_pet_fts (rowid, name, breed, location, pet_type) "
+        "SELECT id, name, breed, location, pet_type FROM adoption_pet"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS adoption_pet_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0008_pet_adoption_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
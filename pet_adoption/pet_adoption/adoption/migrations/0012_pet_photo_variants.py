@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0011_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.21 on 2026-10-18 11:30
+
+import adoption.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0012_pet_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pet',
+            name='photo',
+            field=models.ImageField(blank=True, storage=adoption.storage.ContentAddressedStorage(), upload_to='pets/'),
+        ),
+    ]
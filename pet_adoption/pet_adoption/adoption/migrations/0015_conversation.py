@@ -0,0 +1,78 @@
+# Generated by Django 4.2.21 on 2026-10-18 08:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    Conversation = apps.get_model('adoption', 'Conversation')
+    Message = apps.get_model('adoption', 'Message')
+    AdoptionRequest = apps.get_model('adoption', 'AdoptionRequest')
+    # Existing history counts as read; only new messages raise the unread counters.
+    for request in AdoptionRequest.objects.filter(status='approved').select_related('pet'):
+        Conversation.objects.get_or_create(
+            pet=request.pet, adopter_id=request.adopter_id, defaults={'owner_id': request.pet.owner_id},
+        )
+    for message in Message.objects.select_related('pet').order_by('created_at', 'id').iterator():
+        owner_id = message.pet.owner_id
+        adopter_id = message.receiver_id if message.sender_id == owner_id else message.sender_id
+        conversation, _ = Conversation.objects.get_or_create(
+            pet_id=message.pet_id, adopter_id=adopter_id, defaults={'owner_id': owner_id},
+        )
+        message.conversation = conversation
+        message.save(update_fields=['conversation'])
+        conversation.last_message = message
+        conversation.last_message_at = message.created_at
+        conversation.pinned_count += int(message.is_pinned)
+        conversation.save(update_fields=['last_message', 'last_message_at', 'pinned_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0014_message_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('pinned_count', models.PositiveIntegerField(default=0)),
+                ('owner_unread', models.PositiveIntegerField(default=0)),
+                ('adopter_unread', models.PositiveIntegerField(default=0)),
+                ('owner_read_at', models.DateTimeField(blank=True, null=True)),
+                ('adopter_read_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('adopter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='adopter_conversations', to=settings.AUTH_USER_MODEL)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='adoption.message')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='owned_conversations', to=settings.AUTH_USER_MODEL)),
+                ('pet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='adoption.pet')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='adoption.conversation'),
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'is_pinned', 'created_at'], name='message_conversation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['owner', '-last_message_at'], name='conversation_owner_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['adopter', '-last_message_at'], name='conversation_adopter_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('pet', 'adopter'), name='conversation_pet_adopter_uniq'),
+        ),
+    ]
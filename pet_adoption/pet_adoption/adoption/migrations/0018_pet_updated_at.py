@@ -0,0 +1,31 @@
+# Generated by Django 4.2.21 on 2026-10-18 10:12
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    Pet = apps.get_model('adoption', 'Pet')
+    Pet.objects.update(updated_at=Coalesce('adopted_at', 'created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0017_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['updated_at'], name='pet_updated_idx'),
+        ),
+    ]
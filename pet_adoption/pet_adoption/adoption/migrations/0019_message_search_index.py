@@ -0,0 +1,27 @@
+# Generated by Django 4.2.21 on 2026-10-18 11:02
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS adoption_message_fts USING fts5(content, prefix='2 3')")
+    schema_editor.execute("INSERT INTO adoption_message_fts (rowid, content) SELECT id, content FROM adoption_message")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS adoption_message_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0018_pet_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.21 on 2026-10-18 11:40
+
+import csv
+import math
+import os
+import re
+
+from django.db import migrations, models
+
+# Frozen copies of adoption.geo as of this migration, so later changes to the
+# grid or the name matching cannot change what the backfill writes.
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'gazetteer.csv')
+GRID_DEGREES = 0.1
+GRID_COLUMNS = round(360 / GRID_DEGREES)
+
+
+def normalize(name):
+    return re.sub(r'[^\w]+', ' ', (name or '').lower()).strip()
+
+
+def load_gazetteer():
+    places = {}
+    with open(GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            point = (float(row['latitude']), float(row['longitude']))
+            for name in [row['name'], *filter(None, row['aliases'].split('|'))]:
+                places[normalize(name)] = point
+    return places
+
+
+def cell_for(latitude, longitude):
+    row = math.floor((latitude + 90) / GRID_DEGREES)
+    column = math.floor((longitude + 180) / GRID_DEGREES) % GRID_COLUMNS
+    return row * GRID_COLUMNS + column
+
+
+def geocode_pets(apps, schema_editor):
+    Pet = apps.get_model('adoption', 'Pet')
+    places = load_gazetteer()
+    for location in Pet.objects.values_list('location', flat=True).distinct():
+        point = next(filter(None, (places.get(normalize(part)) for part in [location, *(location or '').split(',')])), None)
+        if point:
+            Pet.objects.filter(location=location).update(
+                latitude=point[0], longitude=point[1], geo_cell=cell_for(*point),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0019_message_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pet',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pet',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='pet_geo_cell_idx'),
+        ),
+        migrations.RunPython(geocode_pets, migrations.RunPython.noop),
+    ]
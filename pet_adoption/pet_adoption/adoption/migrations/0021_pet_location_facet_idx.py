@@ -0,0 +1,21 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adoption', '0020_pet_geo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pet',
+            name='pet_location_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pet',
+            index=models.Index(fields=['location', 'pet_type', 'vaccination_status', 'adopted_at'], name='pet_location_facet_idx'),
+        ),
+    ]
@@ -1,5 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .storage import photo_storage
+from . import geo
 
 class Pet(models.Model):
     PET_TYPES = [
@@ -11,14 +17,103 @@ class Pet(models.Model):
     breed = models.CharField(max_length=100)
     age = models.IntegerField()
     vaccination_status = models.BooleanField(default=False)
-    photo = models.ImageField(upload_to='pets/', blank=True)
+    photo = models.ImageField(upload_to='pets/', blank=True, storage=photo_storage)
+    photo_variants = models.JSONField(default=dict, blank=True)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     pet_type = models.CharField(max_length=10, choices=PET_TYPES)
     location = models.CharField(max_length=100)
+    # Set from location by geocode(); null when the gazetteer does not know the place.
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    adopted_at = models.DateTimeField(null=True, blank=True)
+    adopter = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='adopted_pets')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='pet_created_idx'),
+            models.Index(fields=['pet_type', 'created_at', 'id'], name='pet_type_created_idx'),
+            # Leads with location for location lookups and covers the pet_list facet
+            # columns, so the facet query reads only this index.
+            models.Index(fields=['location', 'pet_type', 'vaccination_status', 'adopted_at'], name='pet_location_facet_idx'),
+            models.Index(fields=['owner', 'created_at', 'id'], name='pet_owner_created_idx'),
+            models.Index(fields=['adopted_at'], name='pet_adopted_idx'),
+            models.Index(fields=['updated_at'], name='pet_updated_idx'),
+            models.Index(fields=['geo_cell', 'latitude', 'longitude'], name='pet_geo_cell_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        pet = super().from_db(db, field_names, values)
+        # The adoption time as stored, so undoing or moving an adoption can re-roll
+        # the day it used to count on; see signals.mark_rollup_days.
+        pet.stored_adopted_at = pet.__dict__.get('adopted_at')
+        return pet
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'location' in update_fields:
+            self.geocode()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'latitude', 'longitude', 'geo_cell'}
+        super().save(*args, **kwargs)
+
+    def geocode(self):
+        point = geo.geocode(self.location)
+        self.latitude, self.longitude = point or (None, None)
+        self.geo_cell = geo.cell_for(*point) if point else None
 
     def is_adopted(self):
-        return self.adoptionrequest_set.filter(status='approved').exists()
+        return self.adopted_at is not None
+
+    def mark_adopted(self, adopter):
+        self.adopter = adopter
+        self.adopted_at = timezone.now()
+        self.save(update_fields=['adopter', 'adopted_at', 'updated_at'])
+
+    def mark_available(self):
+        self.adopter = None
+        self.adopted_at = None
+        self.save(update_fields=['adopter', 'adopted_at', 'updated_at'])
+
+    @property
+    def photo_ready(self):
+        return 'full' in self.photo_variants
+
+    def photo_url(self, size, fmt='jpeg'):
+        if not self.photo_ready:
+            return None
+        return self.photo.storage.url(self.photo_variants[size][fmt])
+
+    def photo_srcset(self, fmt='jpeg'):
+        if not self.photo_ready:
+            return ''
+        return ', '.join(
+            f"{self.photo.storage.url(variant[fmt])} {variant['width']}w"
+            for variant in sorted(self.photo_variants.values(), key=lambda variant: variant['width'])
+        )
+
+    @property
+    def thumb_url(self):
+        return self.photo_url('thumb')
+
+    @property
+    def card_url(self):
+        return self.photo_url('card')
+
+    @property
+    def full_url(self):
+        return self.photo_url('full')
+
+    @property
+    def jpeg_srcset(self):
+        return self.photo_srcset('jpeg')
+
+    @property
+    def webp_srcset(self):
+        return self.photo_srcset('webp')
 
 class AdoptionRequest(models.Model):
     STATUS = [
@@ -30,6 +125,16 @@ class AdoptionRequest(models.Model):
     adopter = models.ForeignKey(User, on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=STATUS, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pet', 'status'], name='request_pet_status_idx'),
+            models.Index(fields=['status'], name='request_status_idx'),
+            models.Index(fields=['adopter', 'created_at', 'id'], name='request_adopter_created_idx'),
+            models.Index(fields=['created_at'], name='request_created_idx'),
+            models.Index(fields=['updated_at'], name='request_updated_idx'),
+        ]
 
 class SuccessStory(models.Model):
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE)
@@ -39,17 +144,240 @@ class SuccessStory(models.Model):
 
 
 
+class Conversation(models.Model):
+    """The chat between a pet's owner and one adopter.
+
+    Message keeps the last-message pointer, pinned count and unread counters up to
+    date, so the chat page, inbox and unread badge never have to scan Message.
+    """
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE, related_name='conversations')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_conversations')
+    adopter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='adopter_conversations')
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    pinned_count = models.PositiveIntegerField(default=0)
+    owner_unread = models.PositiveIntegerField(default=0)
+    adopter_unread = models.PositiveIntegerField(default=0)
+    owner_read_at = models.DateTimeField(null=True, blank=True)
+    adopter_read_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['pet', 'adopter'], name='conversation_pet_adopter_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-last_message_at'], name='conversation_owner_inbox_idx'),
+            models.Index(fields=['adopter', '-last_message_at'], name='conversation_adopter_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} and {self.adopter} about {self.pet.name}"
+
+    @classmethod
+    def open(cls, pet, adopter_id):
+        conversation, _ = cls.objects.get_or_create(pet=pet, adopter_id=adopter_id, defaults={'owner_id': pet.owner_id})
+        return conversation
+
+    def _role(self, user_id):
+        return 'owner' if user_id == self.owner_id else 'adopter'
+
+    def other_participant(self, user):
+        return self.adopter if user.pk == self.owner_id else self.owner
+
+    def unread_for(self, user):
+        return getattr(self, f'{self._role(user.pk)}_unread')
+
+    def record_message(self, message):
+        unread = f'{self._role(message.receiver_id)}_unread'
+        Conversation.objects.filter(pk=self.pk).update(
+            last_message=message,
+            last_message_at=message.created_at,
+            pinned_count=F('pinned_count') + int(message.is_pinned),
+            **{unread: F(unread) + 1},
+        )
+
+    def mark_read(self, user):
+        role = self._role(user.pk)
+        if getattr(self, f'{role}_unread'):
+            now = timezone.now()
+            Conversation.objects.filter(pk=self.pk).update(**{f'{role}_unread': 0, f'{role}_read_at': now})
+            setattr(self, f'{role}_unread', 0)
+            setattr(self, f'{role}_read_at', now)
+
+    def forget_message(self, message):
+        """Roll the counters back for a message that has been deleted."""
+        self.refresh_from_db()
+        role = self._role(message.receiver_id)
+        changes = {}
+        if message.is_pinned:
+            changes['pinned_count'] = F('pinned_count') - 1
+        read_at = getattr(self, f'{role}_read_at')
+        if read_at is None or message.created_at > read_at:
+            changes[f'{role}_unread'] = Greatest(F(f'{role}_unread') - 1, 0)
+        # The delete has already set last_message to NULL if it pointed at this message.
+        if self.last_message_id in (None, message.pk):
+            previous = self.messages.exclude(pk=message.pk).order_by('-created_at', '-id').first()
+            changes['last_message'] = previous
+            changes['last_message_at'] = previous.created_at if previous else None
+        if changes:
+            Conversation.objects.filter(pk=self.pk).update(**changes)
+
+
 class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='received_messages')
     pet = models.ForeignKey(Pet, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_pinned = models.BooleanField(default=False)
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, null=True, related_name='messages')
 
     class Meta:
         ordering = ['-is_pinned', 'created_at']
+        indexes = [
+            models.Index(fields=['pet', 'is_pinned', 'created_at'], name='message_pet_pinned_idx'),
+            models.Index(fields=['pet', 'updated_at'], name='message_pet_updated_idx'),
+            models.Index(fields=['conversation', 'is_pinned', 'created_at'], name='message_conversation_idx'),
+        ]
+
+
+    def __str__(self):
+        return f"Message from {self.sender} to {self.receiver} about {self.pet.name}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            if self.conversation_id is None:
+                adopter_id = self.receiver_id if self.sender_id == self.pet.owner_id else self.sender_id
+                self.conversation = Conversation.open(self.pet, adopter_id)
+            super().save(*args, **kwargs)
+            self.conversation.record_message(self)
+
+    def toggle_pin(self):
+        with transaction.atomic():
+            self.is_pinned = not self.is_pinned
+            self.save(update_fields=['is_pinned', 'updated_at'])
+            if self.conversation_id:
+                Conversation.objects.filter(pk=self.conversation_id).update(
+                    pinned_count=F('pinned_count') + (1 if self.is_pinned else -1),
+                )
+
+
+class MessageTombstone(models.Model):
+    """Records a deleted Message so incremental sync clients can drop it too."""
+    message_id = models.BigIntegerField()
+    pet = models.ForeignKey(Pet, on_delete=models.CASCADE)
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pet', 'deleted_at'], name='tombstone_pet_deleted_idx'),
+        ]
+
+
+class OutgoingEmail(models.Model):
+    STATUS = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
+
+class RollupState(models.Model):
+    """High-water mark of one raw source already folded into the analytics rollups."""
+    source = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} up to {self.high_water_mark}"
+
+
+class RollupDirtyDay(models.Model):
+    """A day to recompute on the next rollup run although no row of it moved a high-water
+    mark: a pet or request was deleted, or an adoption was undone or moved to another day."""
+    source = models.CharField(max_length=50)
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'day'], name='rollup_dirty_day_uniq'),
+        ]
+
+
+class DailyListingStat(models.Model):
+    day = models.DateField()
+    pet_type = models.CharField(max_length=10)
+    location = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'pet_type', 'location'], name='listing_stat_uniq'),
+        ]
+
+
+class DailyRequestStat(models.Model):
+    day = models.DateField()
+    status = models.CharField(max_length=10)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='request_stat_uniq'),
+        ]
+
+
+class DailyAdoptionStat(models.Model):
+    day = models.DateField(unique=True)
+    adoptions = models.PositiveIntegerField(default=0)
+    # Sum of listing-to-adoption times, so averages over any range stay exact.
+    wait_seconds = models.BigIntegerField(default=0)
+
+
+class DailyUserActivity(models.Model):
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    pets_listed = models.PositiveIntegerField(default=0)
+    requests_made = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user'], name='user_activity_uniq'),
+        ]
+
 
+class ImportCheckpoint(models.Model):
+    """Last committed line of one import_pets source, saved in the batch's transaction."""
+    source = models.CharField(max_length=500, unique=True)
+    line = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Message from {self.sender} to {self.receiver} about {self.pet.name}"
\ No newline at end of file
+        return f"{self.source} up to line {self.line}"
@@ -0,0 +1,108 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+# How long a worker owns the emails it claimed. A batch still 'sending' after that
+# belonged to a worker that died, and is retried, possibly sending some emails twice.
+LEASE_SECONDS = 300
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """Drop-in for send_mail() that writes to the outbox instead of talking SMTP.
+
+    Call it inside the transaction that makes the change the email is about, so the
+    email exists if and only if the change was committed.
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def _record_failure(email, error, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        email.next_attempt_at = timezone.now() + backoff(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def _claim(emails, now):
+    """The emails this worker won, leased to it for LEASE_SECONDS.
+
+    Each claim is a conditional UPDATE on the row as it was read, so of several
+    workers that picked the same email only one gets it.
+    """
+    claimed = []
+    for email in emails:
+        lease_until = now + timedelta(seconds=LEASE_SECONDS)
+        won = OutgoingEmail.objects.filter(
+            pk=email.pk, status=email.status, next_attempt_at=email.next_attempt_at,
+        ).update(status='sending', next_attempt_at=lease_until)
+        if won:
+            email.status, email.next_attempt_at = 'sending', lease_until
+            claimed.append(email)
+    return claimed
+
+
+def send_batch(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """Send up to batch_size due emails over one backend connection.
+
+    Returns (sent, failed) counts for the batch. Failures are rescheduled with
+    exponential backoff and marked failed after max_attempts. Emails are claimed
+    before sending, so concurrent workers do not send the same email.
+    """
+    now = timezone.now()
+    due = _claim(
+        OutgoingEmail.objects.filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')[:batch_size],
+        now,
+    )
+    if not due:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning(f"Could not open mail connection: {e}")
+        for email in due:
+            _record_failure(email, e, max_attempts)
+        return 0, len(due)
+    try:
+        for email in due:
+            message = EmailMessage(email.subject, email.body, email.from_email, email.recipients, connection=connection)
+            try:
+                message.send()
+            except Exception as e:
+                logger.warning(f"Error sending outbox email {email.pk}: {e}")
+                _record_failure(email, e, max_attempts)
+                failed += 1
+                continue
+            email.status = 'sent'
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.save(update_fields=['status', 'attempts', 'sent_at'])
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
@@ -0,0 +1,200 @@
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from heapq import nlargest
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+WORST_QUERIES = 5
+MAX_SQL_LENGTH = 1000
+
+_recorder = ContextVar('perf_recorder', default=None)
+
+
+class Recorder:
+    """What one request spent its time on; filled in by timer(), count() and the query wrapper."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.timings = {}
+        self.counts = {}
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+def count(name, amount=1):
+    """Add to a per-request counter; a no-op outside a request."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.counts[name] = recorder.counts.get(name, 0) + amount
+
+
+@contextmanager
+def timer(name):
+    """Add the time spent in the block to a per-request total; a no-op outside a request."""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.timings[name] = recorder.timings.get(name, 0) + (time.perf_counter() - started) * 1000
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.queries.append(((time.perf_counter() - started) * 1000, sql))
+
+
+def _instrument(connection, **kwargs):
+    # First in the list: connection.execute_wrapper() pops from the end, so a wrapper
+    # installed in the middle of someone else's block must not sit after theirs.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+# Covers connections opened later, including those of sync_to_async threads.
+connection_created.connect(_instrument)
+
+
+class TimedTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render for PerformanceMiddleware.
+
+    Includes render inside their parent, so nothing is counted twice.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self._wrapped = template
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def render(self, context=None, request=None):
+        with timer('template'):
+            return self._wrapped.render(context, request)
+
+
+class PerformanceMiddleware:
+    """Per-request query, template, cache and image timings.
+
+    Adds a Server-Timing header (PERF_SERVER_TIMING), logs requests slower than
+    PERF_SLOW_REQUEST_MS as one JSON line with their worst queries, and profiles a
+    PERF_PROFILE_SAMPLE_RATE share of sync requests into PERF_PROFILE_DIR.
+    Streaming responses are timed until the view returns, not until the body is sent.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        for alias in connections:
+            _instrument(connections[alias])
+        recorder = Recorder()
+        token = _recorder.set(recorder)
+        profile = None
+        if settings.PERF_PROFILE_SAMPLE_RATE and random.random() < settings.PERF_PROFILE_SAMPLE_RATE:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already running on this thread.
+                profile = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if profile:
+                profile.disable()
+            _recorder.reset(token)
+        self.report(request, response, recorder, profile)
+        return response
+
+    async def __acall__(self, request):
+        # No profiling here: a profiler on the event loop thread would also see every
+        # other request's coroutines.
+        recorder = Recorder()
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.report(request, response, recorder)
+        return response
+
+    def report(self, request, response, recorder, profile=None):
+        total_ms = recorder.elapsed_ms()
+        db_ms = sum(ms for ms, _ in recorder.queries)
+        cache_hits = recorder.counts.get('cache_local_hits', 0) + recorder.counts.get('cache_shared_hits', 0)
+        cache_misses = recorder.counts.get('cache_misses', 0)
+        if settings.PERF_SERVER_TIMING:
+            metrics = [f'db;dur={db_ms:.1f};desc="{len(recorder.queries)} queries"']
+            for name, label in (('template', 'tpl'), ('image', 'img')):
+                if name in recorder.timings:
+                    metrics.append(f'{label};dur={recorder.timings[name]:.1f}')
+            metrics.append(f'cache;desc="{cache_hits} hits, {cache_misses} misses"')
+            metrics.append(f'total;dur={total_ms:.1f}')
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = ', '.join([existing, *metrics] if existing else metrics)
+        if total_ms >= settings.PERF_SLOW_REQUEST_MS:
+            seen = set()
+            duplicates = sum(1 for _, sql in recorder.queries if sql in seen or seen.add(sql))
+            entry = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'queries': len(recorder.queries),
+                'duplicate_queries': duplicates,
+                'template_ms': round(recorder.timings.get('template', 0), 1),
+                'image_ms': round(recorder.timings.get('image', 0), 1),
+                'cache_hits': cache_hits,
+                'cache_misses': cache_misses,
+                'worst_queries': [
+                    {'ms': round(ms, 1), 'sql': sql[:MAX_SQL_LENGTH]}
+                    for ms, sql in nlargest(WORST_QUERIES, recorder.queries, key=lambda query: query[0])
+                ],
+            }
+            logger.warning(f"Slow request: {json.dumps(entry)}")
+        if profile:
+            os.makedirs(settings.PERF_PROFILE_DIR, exist_ok=True)
+            slug = re.sub(r'\W+', '_', request.path).strip('_')[:80] or 'root'
+            profile.dump_stats(os.path.join(
+                settings.PERF_PROFILE_DIR, f"{time.time_ns()}-{request.method}-{slug}-{total_ms:.0f}ms.prof",
+            ))
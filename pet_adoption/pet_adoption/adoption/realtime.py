@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+HEARTBEAT_SECONDS = 15
+QUEUE_SIZE = 100
+
+
+def conversation_topic(pet_id, user_id):
+    return f"pet:{pet_id}:user:{user_id}"
+
+
+class Broker:
+    """In-process pub/sub for pushing chat events to open streams.
+
+    publish() is safe to call from any thread (views, signals); each subscriber is
+    an asyncio.Queue drained by an async view on the ASGI event loop. Events only
+    reach streams in the same process, so run a single ASGI worker or put a shared
+    broker behind this interface when scaling out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, topic):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        subscription = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, topic, subscription):
+        with self._lock:
+            self._subscribers[topic].discard(subscription)
+            if not self._subscribers[topic]:
+                del self._subscribers[topic]
+
+    def subscriber_count(self, topic):
+        with self._lock:
+            return len(self._subscribers.get(topic, ()))
+
+    def publish(self, topic, event):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(topic, ()))
+        for loop, queue in subscriptions:
+            loop.call_soon_threadsafe(self._deliver, queue, event)
+
+    @staticmethod
+    def _deliver(queue, event):
+        # A stalled client drops its oldest event rather than growing without bound.
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+broker = Broker()
+
+
+def format_sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(topic):
+    # Subscribes on the first iteration, so a response that is never sent (client
+    # gone, middleware short-circuit) leaves no subscription behind.
+    subscription = broker.subscribe(topic)
+    try:
+        yield ": connected\n\n"
+        _, queue = subscription
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(topic, subscription)
+
+
+def message_event(event_type, message):
+    if event_type == 'delete':
+        # The sender may be gone too (cascading user delete), so send ids only.
+        return {'type': 'delete', 'id': message.pk, 'pet_id': message.pet_id, 'conversation_id': message.conversation_id}
+    return {
+        'type': event_type,
+        'id': message.pk,
+        'pet_id': message.pet_id,
+        'conversation_id': message.conversation_id,
+        'sender_id': message.sender_id,
+        'sender': message.sender.username,
+        'content': message.content,
+        'is_pinned': message.is_pinned,
+        'created_at': message.created_at.isoformat(),
+        'updated_at': message.updated_at.isoformat(),
+    }
+
+
+def publish_message(event_type, message):
+    """Build the event now and publish it to both participants once the transaction commits."""
+    event = message_event(event_type, message)
+    topics = {conversation_topic(message.pet_id, user_id) for user_id in (message.sender_id, message.receiver_id)}
+
+    def publish():
+        for topic in topics:
+            broker.publish(topic, event)
+
+    transaction.on_commit(publish)
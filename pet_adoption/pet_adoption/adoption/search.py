@@ -0,0 +1,135 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .pagination import encode_cursor, decode_cursor
+
+TABLE = 'adoption_pet_fts'
+COLUMNS = ('name', 'breed', 'location', 'pet_type')
+MESSAGE_TABLE = 'adoption_message_fts'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def _terms(text):
+    return [f'"{token}"*' for token in _TOKEN_RE.findall(text or '')]
+
+
+def has_terms(text):
+    return bool(_TOKEN_RE.search(text or ''))
+
+
+def build_match(text=None, location=None, pet_type=None):
+    """Turn user input into an FTS5 MATCH expression, or None if nothing is searchable.
+
+    Every word becomes a quoted prefix term, so user input can never inject FTS syntax.
+    """
+    clauses = []
+    terms = _terms(text)
+    if terms:
+        clauses.append(' '.join(terms))
+    location_terms = _terms(location)
+    if location_terms:
+        clauses.append(f"location : ({' '.join(location_terms)})")
+    if not clauses:
+        return None
+    if pet_type:
+        clauses.append(f'pet_type : "{pet_type.replace(chr(34), "")}"')
+    return ' AND '.join(f'({clause})' for clause in clauses)
+
+
+def index_pet(pet):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [pet.pk])
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, {', '.join(COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [pet.pk] + [getattr(pet, column) for column in COLUMNS],
+        )
+
+
+def index_pets(pets):
+    """index_pet for rows that were just inserted, e.g. by bulk_create, which sends no signals."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, {', '.join(COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [[pet.pk] + [getattr(pet, column) for column in COLUMNS] for pet in pets],
+        )
+
+
+def remove_pet(pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [pk])
+
+
+def index_message(message):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {MESSAGE_TABLE} WHERE rowid = %s", [message.pk])
+        cursor.execute(f"INSERT INTO {MESSAGE_TABLE} (rowid, content) VALUES (%s, %s)", [message.pk, message.content])
+
+
+def index_messages(messages):
+    """index_message for rows that were just inserted by bulk_create."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {MESSAGE_TABLE} (rowid, content) VALUES (%s, %s)",
+            [[message.pk, message.content] for message in messages],
+        )
+
+
+def remove_message(pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {MESSAGE_TABLE} WHERE rowid = %s", [pk])
+
+
+def matching_ids(table, match, limit=None):
+    """Subquery of the rowids matching an FTS expression, for use in a pk__in filter.
+
+    With a limit, only the newest (highest rowid) matches are kept.
+    """
+    if limit is None:
+        return RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [match])
+    return RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY rowid DESC LIMIT %s", [match, limit])
+
+
+def rebuild():
+    columns = ', '.join(COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(f"INSERT INTO {TABLE} (rowid, {columns}) SELECT id, {columns} FROM adoption_pet")
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f"DELETE FROM {MESSAGE_TABLE}")
+        cursor.execute(f"INSERT INTO {MESSAGE_TABLE} (rowid, content) SELECT id, content FROM adoption_message")
+        cursor.execute(f"INSERT INTO {MESSAGE_TABLE} ({MESSAGE_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {TABLE}")
+        return cursor.fetchone()[0]
+
+
+def ranked_ids(match, limit, cursor=None):
+    """Return [(pet_id, rank)] best match first, walking (bm25 rank, rowid) as a keyset."""
+    sql = f"SELECT rowid, rank FROM {TABLE} WHERE {TABLE} MATCH %s"
+    params = [match]
+    if cursor:
+        rank, pk = decode_cursor(cursor, parse_key=float)
+        sql += " AND (rank > %s OR (rank = %s AND rowid > %s))"
+        params += [rank, rank, pk]
+    sql += " ORDER BY rank, rowid LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        return db_cursor.fetchall()
+
+
+def search_page(queryset, match, cursor=None, page_size=24):
+    """Ranked counterpart of pagination.keyset_page: returns (items, next_cursor)."""
+    hits = ranked_ids(match, page_size + 1, cursor)
+    next_cursor = None
+    if len(hits) > page_size:
+        hits = hits[:page_size]
+        next_cursor = encode_cursor(hits[-1][1], hits[-1][0])
+    pets = queryset.in_bulk([pk for pk, _ in hits])
+    return [pets[pk] for pk, _ in hits if pk in pets], next_cursor
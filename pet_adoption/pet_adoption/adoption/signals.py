@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import analytics, caching, realtime, search
+from .models import Pet, AdoptionRequest, Conversation, Message, MessageTombstone, SuccessStory
+
+# Pet fields shown on the dashboard; saves touching none of them leave it cached.
+DASHBOARD_PET_FIELDS = {'name', 'breed', 'age'}
+
+
+@receiver(post_save, sender=Pet)
+def index_pet(sender, instance, update_fields=None, **kwargs):
+    if not search.is_available():
+        return
+    if update_fields is not None and not set(update_fields) & set(search.COLUMNS):
+        return
+    search.index_pet(instance)
+
+
+@receiver(post_delete, sender=Pet)
+def unindex_pet(sender, instance, **kwargs):
+    if search.is_available():
+        search.remove_pet(instance.pk)
+
+
+@receiver(post_save, sender=Message)
+def index_message(sender, instance, update_fields=None, **kwargs):
+    if not search.is_available():
+        return
+    if update_fields is not None and 'content' not in update_fields:
+        return
+    search.index_message(instance)
+
+
+@receiver(post_delete, sender=Message)
+def unindex_message(sender, instance, **kwargs):
+    if search.is_available():
+        search.remove_message(instance.pk)
+
+
+@receiver(post_save, sender=Message)
+def push_message(sender, instance, created, **kwargs):
+    realtime.publish_message('message' if created else 'update', instance)
+
+
+@receiver(post_delete, sender=Message)
+def push_message_delete(sender, instance, **kwargs):
+    realtime.publish_message('delete', instance)
+
+
+@receiver(post_delete, sender=Message)
+def tombstone_message(sender, instance, origin=None, **kwargs):
+    # Instance and queryset deletes, including the admin's bulk action, leave a tombstone
+    # and adjust the conversation; cascades from a deleted pet or user take the whole
+    # conversation with them.
+    if getattr(origin, 'model', type(origin)) is not Message:
+        return
+    MessageTombstone.objects.create(
+        message_id=instance.pk, pet_id=instance.pet_id, sender_id=instance.sender_id, receiver_id=instance.receiver_id,
+    )
+    conversation = Conversation.objects.filter(pk=instance.conversation_id).first()
+    if conversation:
+        conversation.forget_message(instance)
+
+
+def _expire(expire, *args):
+    # Now, so the rest of this request reads fresh data, and again after commit, so a
+    # request that re-cached the old rows while the transaction was open can't keep them.
+    expire(*args)
+    transaction.on_commit(lambda: expire(*args))
+
+
+@receiver(post_save, sender=Pet)
+def expire_pet_dashboards(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & DASHBOARD_PET_FIELDS:
+        return
+    user_ids = {instance.owner_id}
+    if not created:
+        user_ids.update(AdoptionRequest.objects.filter(pet=instance).values_list('adopter_id', flat=True))
+    _expire(caching.expire_dashboards, user_ids)
+
+
+@receiver(post_delete, sender=Pet)
+def expire_deleted_pet_dashboard(sender, instance, **kwargs):
+    # Requests for the pet cascade and expire their adopters' dashboards themselves.
+    _expire(caching.expire_dashboards, {instance.owner_id})
+
+
+@receiver(post_save, sender=AdoptionRequest)
+@receiver(post_delete, sender=AdoptionRequest)
+def expire_request_dashboards(sender, instance, **kwargs):
+    _expire(caching.expire_dashboards, {instance.adopter_id, instance.pet.owner_id})
+
+
+@receiver(post_save, sender=Pet)
+@receiver(post_delete, sender=Pet)
+def expire_pet_caches(sender, instance, **kwargs):
+    _expire(caching.expire_pet, instance.pk)
+
+
+@receiver(post_save, sender=SuccessStory)
+@receiver(post_delete, sender=SuccessStory)
+def expire_success_stories(sender, instance, **kwargs):
+    _expire(caching.expire_success_stories)
+
+
+@receiver(post_save, sender=Pet)
+def mark_rollup_days(sender, instance, **kwargs):
+    # An undone or moved adoption leaves the adoptions source, or moves within it, so
+    # only its old day knows it has to be recomputed.
+    stored = getattr(instance, 'stored_adopted_at', None)
+    if stored is not None and stored != instance.adopted_at:
+        analytics.mark_dirty('adoptions', stored)
+    instance.stored_adopted_at = instance.adopted_at
+
+
+@receiver(post_delete, sender=Pet)
+def mark_deleted_pet_days(sender, instance, **kwargs):
+    analytics.mark_dirty('listings', instance.created_at)
+    analytics.mark_dirty('adoptions', instance.adopted_at)
+
+
+@receiver(post_delete, sender=AdoptionRequest)
+def mark_deleted_request_day(sender, instance, **kwargs):
+    analytics.mark_dirty('requests', instance.created_at)
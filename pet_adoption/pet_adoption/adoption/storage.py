@@ -0,0 +1,52 @@
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores files as <dir>/<sha[:2]>/<sha256>.<ext> and never writes the same bytes twice.
+
+    Because a name always maps to the same bytes, URLs can be cached forever.
+    """
+
+    def hashed_name(self, name, content):
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        digest = content_hash(content)
+        return '/'.join(part for part in (directory, digest[:2], digest + ext) if part)
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if not self.exists(name):
+            # Write under a unique temp name, then rename into place: two uploads of the
+            # same bytes racing each other both end up with the one identical file.
+            tmp_name = super()._save(f"{name}.{uuid.uuid4().hex}.tmp", content)
+            os.replace(self.path(tmp_name), self.path(name))
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Identical bytes share one name on purpose, so no _1/_abc123 suffixing.
+        return name
+
+
+photo_storage = ContentAddressedStorage()
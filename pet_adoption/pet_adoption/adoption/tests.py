@@ -1,3 +1,1444 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    Pet, AdoptionRequest, Conversation, ImportCheckpoint, Message, MessageTombstone, OutgoingEmail, SuccessStory,
+    DailyAdoptionStat, DailyListingStat, DailyRequestStat, DailyUserActivity,
+)
+from . import analytics, caching, db, facets, geo, images, outbox, realtime, views
+from .cache_backends import LocalLRU, TieredCache, is_shared
+from .caching import attach_card_versions
+from .storage import is_hashed_name
+
+
+def image_upload(size=(1600, 900), name='photo.png', fmt='PNG'):
+    output = BytesIO()
+    Image.new('RGB', size, (200, 120, 40)).save(output, format=fmt)
+    return SimpleUploadedFile(name, output.getvalue(), content_type=f'image/{fmt.lower()}')
+
+
+def make_pet(owner, **kwargs):
+    fields = {
+        'name': 'Rex', 'breed': 'Mixed', 'age': 3, 'pet_type': 'dog', 'location': 'Pune',
+    }
+    fields.update(kwargs)
+    return Pet.objects.create(owner=owner, **fields)
+
+
+class AdoptionStateTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pet = make_pet(self.owner)
+        self.adoption_request = AdoptionRequest.objects.create(pet=self.pet, adopter=self.adopter)
+
+    def test_approve_marks_pet_adopted(self):
+        self.client.force_login(self.owner)
+        self.client.post(reverse('adoption:approve_adoption', args=[self.adoption_request.pk]))
+        self.pet.refresh_from_db()
+        self.assertTrue(self.pet.is_adopted())
+        self.assertEqual(self.pet.adopter, self.adopter)
+
+    def test_rejecting_approved_request_clears_state(self):
+        self.client.force_login(self.owner)
+        self.client.post(reverse('adoption:approve_adoption', args=[self.adoption_request.pk]))
+        self.client.post(reverse('adoption:reject_adoption', args=[self.adoption_request.pk]))
+        self.pet.refresh_from_db()
+        self.assertFalse(self.pet.is_adopted())
+        self.assertIsNone(self.pet.adopter)
+
+    def test_rejecting_one_of_two_approvals_keeps_the_pet_adopted(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pass12345')
+        other_request = AdoptionRequest.objects.create(pet=self.pet, adopter=other)
+        self.client.force_login(self.owner)
+        self.client.post(reverse('adoption:approve_adoption', args=[self.adoption_request.pk]))
+        self.client.post(reverse('adoption:approve_adoption', args=[other_request.pk]))
+        adopted_at = Pet.objects.get(pk=self.pet.pk).adopted_at
+        self.client.post(reverse('adoption:reject_adoption', args=[other_request.pk]))
+        self.pet.refresh_from_db()
+        self.assertEqual((self.pet.adopter, self.pet.adopted_at), (self.adopter, adopted_at))
+        self.client.post(reverse('adoption:reject_adoption', args=[self.adoption_request.pk]))
+        self.pet.refresh_from_db()
+        self.assertFalse(self.pet.is_adopted())
+
+    def test_backfill_dates_adoptions_by_their_approval(self):
+        approved_at = timezone.now()
+        self.adoption_request.status = 'approved'
+        self.adoption_request.save()
+        AdoptionRequest.objects.filter(pk=self.adoption_request.pk).update(created_at=approved_at - timedelta(days=5))
+        story = SuccessStory.objects.create(pet=self.pet, adopter=self.adopter, story='Adoption approved!')
+        SuccessStory.objects.filter(pk=story.pk).update(created_at=approved_at)
+        import_module('adoption.migrations.0008_pet_adoption_state').backfill_adoption_state(apps, None)
+        self.pet.refresh_from_db()
+        self.assertEqual((self.pet.adopter, self.pet.adopted_at), (self.adopter, approved_at))
+
+    def test_pet_list_query_count_is_flat(self):
+        for i in range(20):
+            make_pet(self.owner, name=f'Pet {i}')
+        self.pet.mark_adopted(self.adopter)
+        self.client.force_login(self.adopter)
+        # session + user + pets + facet types, locations and locations per type
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('adoption:pet_list'))
+        self.assertContains(response, 'Adopted')
+
+
+class PetListPaginationTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        for i in range(30):
+            make_pet(self.owner, name=f'Dog {i}')
+            make_pet(self.owner, name=f'Cat {i}', pet_type='cat')
+        self.client.force_login(self.owner)
+
+    def test_json_pages_walk_every_filtered_pet_once(self):
+        seen = []
+        query = 'pet_type=cat'
+        while query:
+            data = self.client.get(f"{reverse('adoption:pet_list_json')}?{query}").json()
+            seen.extend(pet['id'] for pet in data['results'])
+            query = data['next_page_query']
+        expected = Pet.objects.filter(pet_type='cat').order_by('-created_at', '-id')
+        self.assertEqual(seen, list(expected.values_list('id', flat=True)))
+
+    def test_html_page_links_to_next_cursor(self):
+        response = self.client.get(reverse('adoption:pet_list'))
+        self.assertEqual(len(response.context['pets']), 24)
+        self.assertIn('cursor=', response.context['next_page_query'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('adoption:pet_list_json'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PetSearchTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.labrador = make_pet(self.owner, name='Bruno', breed='Labrador', location='Pune')
+        self.beagle = make_pet(self.owner, name='Labby', breed='Beagle', location='Mumbai')
+        self.cat = make_pet(self.owner, name='Misty', breed='Persian', pet_type='cat', location='Pune')
+        self.client.force_login(self.owner)
+
+    def search(self, **params):
+        data = self.client.get(reverse('adoption:pet_list_json'), params).json()
+        return [pet['id'] for pet in data['results']]
+
+    def test_prefix_search_across_columns(self):
+        self.assertCountEqual(self.search(q='lab'), [self.labrador.pk, self.beagle.pk])
+
+    def test_location_and_type_filters(self):
+        self.assertEqual(self.search(location='pun', pet_type='cat'), [self.cat.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.cat.location = 'Delhi'
+        self.cat.save()
+        self.assertEqual(self.search(location='delhi'), [self.cat.pk])
+        self.cat.delete()
+        self.assertEqual(self.search(location='delhi'), [])
+
+    def test_fts_syntax_in_input_is_neutralised(self):
+        self.assertEqual(self.search(q='"bruno" )(*'), [self.labrador.pk])
+
+
+class QueryBudgetTests(TestCase):
+    """Per-view query budgets plus EXPLAIN QUERY PLAN checks for the hot views.
+
+    Budgets include the session and user lookups done by the auth middleware. Each view
+    is hit with a small and a larger data set; the query count must not grow with rows.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pass12345', is_staff=True)
+        self.adopters = [User.objects.create_user(f'adopter{i}', f'a{i}@example.com', 'pass12345') for i in range(3)]
+        self.pet = make_pet(self.owner)
+        AdoptionRequest.objects.create(pet=self.pet, adopter=self.adopters[0], status='approved')
+        self.add_rows(2)
+
+    def add_rows(self, count):
+        for i in range(count):
+            pet = make_pet(self.owner, name=f'Pet {Pet.objects.count()}', pet_type=('dog', 'cat')[i % 2])
+            for adopter in self.adopters:
+                AdoptionRequest.objects.create(pet=pet, adopter=adopter)
+                AdoptionRequest.objects.create(pet=self.pet, adopter=adopter)
+            Message.objects.create(sender=self.owner, receiver=self.adopters[0], pet=self.pet, content='hi')
+            Message.objects.create(sender=self.adopters[0], receiver=self.owner, pet=self.pet, content='hello')
+
+    def run_view(self, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return captured.captured_queries
+
+    def assert_indexed(self, queries):
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'adoption_pet_fts' in sql:
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    self.assertFalse(
+                        detail.startswith('SCAN adoption_') and 'INDEX' not in detail,
+                        f'Full table scan "{detail}" for: {sql}',
+                    )
+
+    def assert_budget(self, user, url, budget):
+        small = self.run_view(user, url)
+        self.add_rows(10)
+        large = self.run_view(user, url)
+        self.assertLessEqual(len(large), budget, [q['sql'] for q in large])
+        self.assertEqual(len(small), len(large), 'query count grows with rows (N+1)')
+        self.assert_indexed(large)
+
+    def test_pet_list(self):
+        # The page is one query; the facets are one bounded query per dimension
+        # (types, locations, locations per type).
+        self.assert_budget(self.owner, reverse('adoption:pet_list'), 6)
+        # The facet rows cached above serve every pet type; drop them so the second
+        # check is cold in both of its runs as well.
+        caching.expire_pet_list()
+        self.assert_budget(self.owner, reverse('adoption:pet_list') + '?pet_type=dog', 6)
+
+    def test_dashboard(self):
+        self.assert_budget(self.owner, reverse('adoption:dashboard'), 7)
+
+    def test_messages(self):
+        self.assert_budget(self.adopters[0], reverse('adoption:messages', args=[self.pet.pk]), 6)
+
+    def test_messages_as_owner(self):
+        self.assert_budget(self.owner, reverse('adoption:messages', args=[self.pet.pk]), 6)
+
+    def test_applicants_list(self):
+        self.assert_budget(self.owner, reverse('adoption:applicants', args=[self.pet.pk]), 4)
+
+    def test_analytics_dashboard(self):
+        self.assert_budget(self.staff, reverse('adoption:analytics_dashboard'), 8)
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pets = [make_pet(self.owner, name=f'Pet {i}') for i in range(views.DASHBOARD_PAGE_SIZE + 5)]
+        for pet in self.pets:
+            AdoptionRequest.objects.create(pet=pet, adopter=self.adopter)
+        self.client.force_login(self.owner)
+
+    def test_sections_are_paginated(self):
+        response = self.client.get(reverse('adoption:dashboard'))
+        page = response.context['owned_pets']
+        self.assertEqual(len(page.items), views.DASHBOARD_PAGE_SIZE)
+        response = self.client.get(reverse('adoption:dashboard'), {'pets_cursor': page.next_cursor})
+        self.assertEqual(len(response.context['owned_pets'].items), 5)
+        self.assertEqual(self.client.get(reverse('adoption:dashboard'), {'pets_cursor': 'bogus'}).status_code, 400)
+
+    def test_warm_dashboard_skips_section_queries(self):
+        cold = self.client.get(reverse('adoption:dashboard'))
+        with CaptureQueriesContext(connection) as captured:
+            warm = self.client.get(reverse('adoption:dashboard'))
+        self.assertEqual(warm.content, cold.content)
+        # Session, user, unread total and inbox; the three sections come from cache.
+        self.assertEqual(len(captured), 4, [q['sql'] for q in captured.captured_queries])
+
+    def test_cached_forms_work_in_a_second_browser(self):
+        first, second = Client(enforce_csrf_checks=True), Client(enforce_csrf_checks=True)
+        for client in (first, second):
+            client.force_login(self.owner)
+        first.get(reverse('adoption:dashboard'))
+        page = second.get(reverse('adoption:dashboard')).content.decode()
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page).group(1)
+        request = AdoptionRequest.objects.filter(pet__owner=self.owner).order_by('-pk').first()
+        response = second.post(reverse('adoption:approve_adoption', args=[request.pk]), {'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+
+    def test_pet_change_expires_owner_and_adopter_fragments(self):
+        self.client.get(reverse('adoption:dashboard'))
+        pet = self.pets[-1]
+        with self.captureOnCommitCallbacks(execute=True):
+            pet.name = 'Renamed'
+            pet.save()
+        self.assertContains(self.client.get(reverse('adoption:dashboard')), 'Renamed')
+        self.client.force_login(self.adopter)
+        self.assertContains(self.client.get(reverse('adoption:dashboard')), 'Renamed')
+
+    def test_new_request_expires_owner_fragment(self):
+        self.client.get(reverse('adoption:dashboard'))
+        newcomer = User.objects.create_user('newcomer', 'n@example.com', 'pass12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            AdoptionRequest.objects.create(pet=self.pets[-1], adopter=newcomer)
+        self.assertContains(self.client.get(reverse('adoption:dashboard')), 'newcomer')
+
+
+class AnalyticsRollupTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pass12345', is_staff=True)
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.today = timezone.localdate()
+        self.week_ago = timezone.now() - timedelta(days=7)
+        self.dogs = [make_pet(self.owner, name=f'Dog {i}') for i in range(2)]
+        self.cat = make_pet(self.owner, name='Old cat', pet_type='cat', location='Lyon')
+        Pet.objects.filter(pk=self.cat.pk).update(created_at=self.week_ago)
+        self.requests = [AdoptionRequest.objects.create(pet=pet, adopter=self.adopter) for pet in self.dogs + [self.cat]]
+
+    def test_rollups_count_each_source_once(self):
+        analytics.update_rollups()
+        self.assertEqual(
+            {(row.day, row.pet_type, row.location, row.count) for row in DailyListingStat.objects.all()},
+            {(self.today, 'dog', 'Pune', 2), (self.week_ago.date(), 'cat', 'Lyon', 1)},
+        )
+        self.assertEqual(DailyRequestStat.objects.get().count, 3)
+        activity = DailyUserActivity.objects.filter(day=self.today)
+        # A Count('pet') + Count('adoptionrequest') join would report 2 x 3 here.
+        self.assertEqual(activity.get(user=self.owner).pets_listed, 2)
+        self.assertEqual(activity.get(user=self.adopter).requests_made, 3)
+
+    def test_update_only_recomputes_changed_days(self):
+        analytics.update_rollups()
+        # Pets and requests saved within OVERLAP of the mark are read again: both listing days.
+        self.assertEqual(analytics.update_rollups(), {'listings': 2, 'requests': 1, 'adoptions': 0})
+        request = self.requests[0]
+        request.status = 'approved'
+        request.save()
+        request.pet.mark_adopted(self.adopter)
+        Pet.objects.filter(pk=request.pet.pk).update(created_at=F('adopted_at') - timedelta(days=3))
+        analytics.update_rollups()
+        self.assertEqual(
+            set(DailyRequestStat.objects.values_list('status', 'count')), {('approved', 1), ('pending', 2)},
+        )
+        adoption = DailyAdoptionStat.objects.get()
+        self.assertEqual((adoption.adoptions, adoption.wait_seconds), (1, 3 * 86400))
+
+    def test_undone_adoption_and_edits_are_rolled_back(self):
+        pet = self.dogs[0]
+        pet.mark_adopted(self.adopter)
+        analytics.update_rollups()
+        self.assertEqual(DailyAdoptionStat.objects.get().adoptions, 1)
+        Pet.objects.get(pk=pet.pk).mark_available()
+        cat = Pet.objects.get(pk=self.cat.pk)
+        cat.pet_type = 'dog'
+        cat.save()
+        self.dogs[1].delete()
+        analytics.update_rollups()
+        self.assertFalse(DailyAdoptionStat.objects.exists())
+        self.assertEqual(
+            {(row.day, row.pet_type, row.count) for row in DailyListingStat.objects.all()},
+            {(self.today, 'dog', 1), (self.week_ago.date(), 'dog', 1)},
+        )
+        self.assertEqual(DailyRequestStat.objects.get().count, 2)
+        self.assertEqual(DailyUserActivity.objects.get(day=self.today, user=self.owner).pets_listed, 1)
+
+    def test_old_edit_does_not_rescan_the_days_in_between(self):
+        middle = make_pet(self.owner, name='Middle')
+        Pet.objects.filter(pk=middle.pk).update(created_at=timezone.now() - timedelta(days=3))
+        spans = list(analytics._in_spans('created_at', {self.week_ago.date(), self.today}))
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(set(Pet.objects.filter(spans[0])), {*self.dogs, self.cat})
+        yesterday = self.today - timedelta(days=1)
+        self.assertEqual(analytics._runs({self.today, yesterday, self.week_ago.date()}), [
+            [self.week_ago.date(), self.week_ago.date()], [yesterday, self.today],
+        ])
+
+    def test_rebuild_handles_sparse_history(self):
+        pets = [make_pet(self.owner, name=f'Old {i}') for i in range(1000)]
+        for i, pet in enumerate(pets):
+            Pet.objects.filter(pk=pet.pk).update(created_at=F('created_at') - timedelta(days=2 * i + 10))
+        call_command('update_analytics', '--rebuild', stdout=StringIO())
+        self.assertEqual(DailyListingStat.objects.filter(day__lt=self.week_ago.date()).count(), 1000)
+
+    def test_rebuild_matches_incremental(self):
+        analytics.update_rollups()
+        incremental = sorted(DailyListingStat.objects.values_list('day', 'pet_type', 'location', 'count'))
+        call_command('update_analytics', '--rebuild', stdout=StringIO())
+        self.assertEqual(sorted(DailyListingStat.objects.values_list('day', 'pet_type', 'location', 'count')), incremental)
+
+    def test_dashboard_filters_by_date_range(self):
+        analytics.update_rollups()
+        self.client.force_login(self.staff)
+        url = reverse('adoption:analytics_dashboard')
+        response = self.client.get(url, {'start': self.today.isoformat(), 'end': self.today.isoformat()})
+        self.assertEqual([(row['pet_type'], row['count']) for row in response.context['pet_types']], [('dog', 2)])
+        response = self.client.get(url, {'start': (self.today - timedelta(days=10)).isoformat()})
+        self.assertEqual(sum(row['count'] for row in response.context['pet_types']), 3)
+        self.assertEqual(self.client.get(url, {'start': '2026-02-30'}).status_code, 400)
+
+
+class BrokenCache(LocMemCache):
+    def get(self, *args, **kwargs):
+        raise ConnectionError('redis is down')
+
+    set = get
+
+
+class TieredCacheTests(TestCase):
+    def make_cache(self, **options):
+        return TieredCache('test', {'OPTIONS': {'SHARED': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-test'}, **options}})
+
+    def setUp(self):
+        self.cache = self.make_cache(LOCAL_MAX_ENTRIES=2)
+        self.cache.clear()
+
+    def test_local_tier_answers_repeat_reads(self):
+        self.cache.set('a', {'n': 1})
+        self.assertEqual(self.cache.get('a'), {'n': 1})
+        self.assertIsNone(self.cache.get('missing'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['local_hits'], stats['shared_hits'], stats['misses']), (1, 0, 1))
+
+    def test_least_recently_used_entry_is_evicted_to_shared_tier(self):
+        for key in 'abc':
+            self.cache.set(key, key)
+        self.assertEqual(self.cache.stats()['local_entries'], 2)
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertEqual(self.cache.stats()['shared_hits'], 1)
+
+    def test_local_entries_expire(self):
+        lru = LocalLRU(10)
+        lru.set('a', 1, ttl=0)
+        self.assertIsNone(lru.get('a'))
+
+    def test_falls_back_when_shared_backend_errors(self):
+        cache_ = TieredCache('test', {'OPTIONS': {'SHARED': {'BACKEND': 'adoption.tests.BrokenCache'}, 'LOCAL_TIMEOUT': 0}})
+        cache_.set('a', 1)
+        self.assertEqual(cache_.get('a'), 1)
+        stats = cache_.stats()
+        self.assertTrue(stats['fallback'])
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual((is_shared(self.cache), is_shared(cache_)), (True, False))
+
+    def test_missing_client_library_falls_back(self):
+        cache_ = TieredCache('test', {'OPTIONS': {'SHARED': {'BACKEND': 'adoption.tests.NoSuchCache'}}})
+        cache_.set('a', 1)
+        self.assertEqual((cache_.get('a'), cache_.stats()['fallback']), (1, True))
+
+
+class CacheAsideTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.pet = make_pet(self.owner, name='Bruno')
+        self.client.force_login(self.owner)
+
+    def test_pet_detail_is_cached_until_the_pet_changes(self):
+        url = reverse('adoption:pet_detail', args=[self.pet.pk])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(url)
+        self.assertFalse([q for q in captured.captured_queries if 'adoption_pet' in q['sql']])
+        self.pet.name = 'Bruno II'
+        self.pet.save()
+        self.assertContains(self.client.get(url), 'Bruno II')
+        self.assertEqual(self.client.get(reverse('adoption:pet_detail', args=[0])).status_code, 404)
+
+    def test_pet_list_results_are_cached_per_filter(self):
+        self.client.get(reverse('adoption:pet_list'), {'pet_type': 'dog'})
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('adoption:pet_list'), {'pet_type': 'dog'})
+        self.assertEqual([pet.name for pet in response.context['pets']], ['Bruno'])
+        self.assertFalse([q for q in captured.captured_queries if 'adoption_pet' in q['sql']])
+        make_pet(self.owner, name='Rex')
+        response = self.client.get(reverse('adoption:pet_list'), {'pet_type': 'dog'})
+        self.assertEqual([pet.name for pet in response.context['pets']], ['Rex', 'Bruno'])
+        self.assertEqual(len(self.client.get(reverse('adoption:pet_list'), {'pet_type': 'cat'}).context['pets']), 0)
+
+    def test_card_version_moves_with_pet_and_adoption_state(self):
+        version = attach_card_versions([self.pet])[0].card_version
+        self.assertEqual(attach_card_versions([self.pet])[0].card_version, version)
+        self.pet.mark_adopted(User.objects.create_user('adopter', 'a@example.com', 'pass12345'))
+        self.assertNotEqual(attach_card_versions([self.pet])[0].card_version, version)
+        self.assertContains(self.client.get(reverse('adoption:pet_list')), 'Adopted')
+
+    def test_card_benchmark_runs(self):
+        out = StringIO()
+        generation = caching.pet_list_generation()
+        call_command('benchmark_pet_cards', '--count', '5', '--runs', '1', stdout=out)
+        self.assertIn('5 cards', out.getvalue())
+        self.assertEqual(Pet.objects.count(), 1)
+        # Its own cache: list pages stay valid and no card keys outlive the rolled-back pets.
+        self.assertEqual(caching.pet_list_generation(), generation)
+        self.assertIsNone(cache.get(caching._card_key(self.pet.pk + 1)))
+
+    def test_success_stories_refresh_on_new_story(self):
+        self.assertNotContains(self.client.get(reverse('adoption:success_stories')), 'Found a home')
+        SuccessStory.objects.create(pet=self.pet, adopter=self.owner, story='Found a home')
+        self.assertContains(self.client.get(reverse('adoption:success_stories')), 'Found a home')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.pet = make_pet(self.owner, name='Bruno')
+        self.client.force_login(self.owner)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_answer_304_without_rendering(self):
+        for url in (reverse('adoption:pet_list'), reverse('adoption:pet_detail', args=[self.pet.pk]),
+                    reverse('adoption:success_stories'), reverse('adoption:home')):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200, url)
+            second = self.revalidate(url, first)
+            self.assertEqual(second.status_code, 304, url)
+            self.assertEqual(second.templates, [])
+            self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_pet_change_invalidates_list_and_detail(self):
+        urls = [reverse('adoption:pet_list'), reverse('adoption:pet_detail', args=[self.pet.pk])]
+        first = {url: self.client.get(url) for url in urls}
+        self.pet.mark_adopted(User.objects.create_user('adopter', 'adopter@example.com', 'pass12345'))
+        for url in urls:
+            self.assertEqual(self.revalidate(url, first[url]).status_code, 200, url)
+
+    def test_etag_differs_per_user_and_varies_on_cookie(self):
+        url = reverse('adoption:pet_detail', args=[self.pet.pk])
+        first = self.client.get(url)
+        self.assertIn('Cookie', first['Vary'])
+        self.assertIn('private', first['Cache-Control'])
+        self.client.force_login(User.objects.create_user('other', 'other@example.com', 'pass12345'))
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+        self.client.logout()
+        anonymous = self.client.get(reverse('adoption:success_stories'))
+        self.assertIn('public', anonymous['Cache-Control'])
+        self.assertIn('no-cache', anonymous['Cache-Control'])
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException('connection reset')
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pet = make_pet(self.owner)
+
+    def test_views_queue_instead_of_sending(self):
+        self.client.force_login(self.adopter)
+        self.client.post(reverse('adoption:apply_adoption', args=[self.pet.pk]))
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutgoingEmail.objects.get()
+        self.assertEqual(queued.recipients, ['owner@example.com'])
+
+    def test_worker_drains_over_locmem(self):
+        for i in range(5):
+            outbox.queue_mail(f'Subject {i}', 'Body', 'from@example.com', ['to@example.com'])
+        out = StringIO()
+        call_command('send_queued_mail', batch_size=2, stdout=out)
+        self.assertRegex(out.getvalue(), r'Sent 5 emails, 0 failed, in [\d.]+s\.')
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutgoingEmail.objects.exclude(status='sent').exists())
+
+    def test_worker_writes_filebased(self):
+        with tempfile.TemporaryDirectory() as path:
+            with override_settings(EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend', EMAIL_FILE_PATH=path):
+                outbox.queue_mail('Hello', 'Body', 'from@example.com', ['to@example.com'])
+                outbox.send_batch()
+            self.assertEqual(len(os.listdir(path)), 1)
+
+    @override_settings(EMAIL_BACKEND='adoption.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        email = outbox.queue_mail('Hello', 'Body', 'from@example.com', ['to@example.com'])
+        self.assertEqual(outbox.send_batch(max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(outbox.send_batch(max_attempts=2), (0, 0))
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        outbox.send_batch(max_attempts=2)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+        self.assertIn('connection reset', email.last_error)
+
+    def test_concurrent_workers_send_each_email_once(self):
+        for i in range(3):
+            outbox.queue_mail(f'Subject {i}', 'Body', 'from@example.com', ['to@example.com'])
+        # A second worker read the same due rows before this one claimed and sent them.
+        stale = list(OutgoingEmail.objects.all())
+        self.assertEqual(outbox.send_batch(), (3, 0))
+        self.assertEqual(outbox._claim(stale, timezone.now()), [])
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_expired_lease_is_retried(self):
+        email = outbox.queue_mail('Hello', 'Body', 'from@example.com', ['to@example.com'])
+        outbox._claim([email], timezone.now())
+        self.assertEqual(outbox.send_batch(), (0, 0))
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.send_batch(), (1, 0))
+
+
+class PhotoPipelineTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name)
+        self.override.enable()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.client.force_login(self.owner)
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def upload(self):
+        self.client.post(reverse('adoption:pet_form'), {
+            'name': 'Rex', 'breed': 'Mixed', 'age': 3, 'pet_type': 'dog', 'location': 'Pune', 'photo': image_upload(),
+        })
+        return Pet.objects.get()
+
+    def test_placeholder_until_processed(self):
+        pet = self.upload()
+        self.assertFalse(pet.photo_ready)
+        response = self.client.get(reverse('adoption:pet_detail', args=[pet.pk]))
+        self.assertContains(response, 'pet-placeholder.svg')
+
+    def test_variants_keep_aspect_ratio(self):
+        pet = self.upload()
+        call_command('process_pet_photos', workers=1, stdout=StringIO())
+        pet.refresh_from_db()
+        self.assertEqual((pet.photo_variants['full']['width'], pet.photo_variants['full']['height']), (1200, 675))
+        self.assertEqual((pet.photo_variants['thumb']['width'], pet.photo_variants['thumb']['height']), (200, 113))
+        with open(os.path.join(self.media.name, pet.photo_variants['card']['webp']), 'rb') as f:
+            self.assertEqual(Image.open(f).format, 'WEBP')
+        self.assertIn(' 400w', pet.webp_srcset)
+        response = self.client.get(reverse('adoption:pet_list'))
+        self.assertContains(response, 'type="image/webp"')
+
+    def test_undecodable_photo_is_not_retried(self):
+        pet = make_pet(self.owner, photo=SimpleUploadedFile('broken.jpg', b'not an image'))
+        self.assertEqual(images.process_pets([pet], workers=1), (0, 1))
+        self.assertFalse(images.pending_pets().exists())
+
+
+PEAK_RSS_SCRIPT = """
+import resource, sys
+import django
+django.setup()
+from adoption.images import render_variants
+
+def peak():
+    # ru_maxrss survives exec, so in a child of the test runner it starts at the runner's
+    # size; VmHWM belongs to this process's own memory map.
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+before = peak()
+render_variants(sys.argv[1])
+print((peak() - before) * 1024)
+"""
+
+
+class BoundedDecodeTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_image(self, name, size, fmt, **options):
+        path = os.path.join(self.tmp.name, name)
+        Image.new('RGB', size, (90, 160, 220)).save(path, format=fmt, **options)
+        return path
+
+    def peak_memory(self, path):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='pet_adoption.settings')
+        result = subprocess.run(
+            [sys.executable, '-c', PEAK_RSS_SCRIPT, path],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        return int(result.stdout.strip())
+
+    def test_large_jpeg_stays_under_budget(self):
+        path = self.write_image('big.jpg', (7728, 5152), 'JPEG', quality=80)
+        self.assertLess(self.peak_memory(path), images.PEAK_MEMORY_BUDGET)
+
+    def test_largest_png_stays_under_budget(self):
+        path = self.write_image('big.png', (4000, 3000), 'PNG')
+        self.assertLess(self.peak_memory(path), images.PEAK_MEMORY_BUDGET)
+
+    def test_rotated_png_stays_under_budget(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        path = self.write_image('sideways.png', (4000, 3000), 'PNG', exif=exif)
+        self.assertLess(self.peak_memory(path), images.PEAK_MEMORY_BUDGET)
+        full = images.render_variants(path)['full']
+        self.assertEqual((full['width'], full['height']), (900, 1200))
+
+    def test_pixel_limit_rejects_oversized_png(self):
+        self.client.force_login(User.objects.create_user('owner', 'owner@example.com', 'pass12345'))
+        response = self.client.post(reverse('adoption:pet_form'), {
+            'name': 'Rex', 'breed': 'Mixed', 'age': 3, 'pet_type': 'dog', 'location': 'Pune',
+            'photo': image_upload(size=(5000, 3000)),
+        })
+        self.assertFalse(Pet.objects.exists())
+        self.assertIn('photo', response.context['form'].errors)
+
+    def test_exif_orientation_is_applied(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise on display
+        path = self.write_image('sideways.jpg', (400, 200), 'JPEG', exif=exif)
+        full = images.render_variants(path)['full']
+        self.assertEqual((full['width'], full['height']), (200, 400))
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media.name)
+        self.override.enable()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+
+    def tearDown(self):
+        self.override.disable()
+        self.media.cleanup()
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media.name)
+            for root, _, names in os.walk(self.media.name) for name in names
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        first = make_pet(self.owner, photo=image_upload(name='OIP.png'))
+        second = make_pet(self.owner, photo=image_upload(name='download.png'))
+        self.assertEqual(first.photo.name, second.photo.name)
+        self.assertTrue(is_hashed_name(first.photo.name))
+        self.assertEqual(self.stored_files(), [first.photo.name])
+
+    def test_hashed_media_is_served_immutable(self):
+        pet = make_pet(self.owner, photo=image_upload())
+        response = views.serve_media(RequestFactory().get(pet.photo.url), pet.photo.name)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        # The route only exists with DEBUG on; tests run with it off, like production.
+        self.assertEqual(self.client.get(pet.photo.url).status_code, 404)
+
+    def test_rehash_command_moves_legacy_files(self):
+        os.makedirs(os.path.join(self.media.name, 'pets'))
+        for name in ('OIP.png', 'OIP_1.png'):
+            Image.new('RGB', (10, 10)).save(os.path.join(self.media.name, 'pets', name))
+        pets = [make_pet(self.owner, photo='pets/OIP.png'), make_pet(self.owner, photo='pets/OIP_1.png')]
+        call_command('rehash_media', stdout=StringIO())
+        names = {Pet.objects.get(pk=pet.pk).photo.name for pet in pets}
+        self.assertEqual(len(names), 1)
+        self.assertEqual(self.stored_files(), list(names))
+
+    def test_rehash_expires_cached_cards_and_etags(self):
+        os.makedirs(os.path.join(self.media.name, 'pets'))
+        for name in ('OIP.png', 'legacy.jpg', 'legacy.webp'):
+            Image.new('RGB', (10, 10)).save(os.path.join(self.media.name, 'pets', name), format='PNG')
+        legacy = {'width': 10, 'height': 10, 'jpeg': 'pets/legacy.jpg', 'webp': 'pets/legacy.webp'}
+        pet = make_pet(self.owner, photo='pets/OIP.png')
+        Pet.objects.filter(pk=pet.pk).update(photo_variants={size: legacy for size in images.VARIANTS})
+        self.client.force_login(self.owner)
+        detail = reverse('adoption:pet_detail', args=[pet.pk])
+        self.assertContains(self.client.get(reverse('adoption:pet_list')), 'pets/legacy.jpg')
+        etag = self.client.get(detail)['ETag']
+        call_command('rehash_media', stdout=StringIO())
+        rehashed = Pet.objects.get(pk=pet.pk).photo_variants['full']['jpeg']
+        response = self.client.get(reverse('adoption:pet_list'))
+        self.assertNotContains(response, 'pets/legacy.jpg')
+        self.assertContains(response, rehashed)
+        self.assertEqual(self.client.get(detail, headers={'if_none_match': etag}).status_code, 200)
+
+
+class RealtimeChatTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pet = make_pet(self.owner)
+        AdoptionRequest.objects.create(pet=self.pet, adopter=self.adopter, status='approved')
+        Conversation.open(self.pet, self.adopter.pk)
+
+    async def test_saved_message_reaches_subscriber(self):
+        topic = realtime.conversation_topic(self.pet.pk, self.adopter.pk)
+        subscription = realtime.broker.subscribe(topic)
+        try:
+            def send():
+                with self.captureOnCommitCallbacks(execute=True):
+                    return Message.objects.create(sender=self.owner, receiver=self.adopter, pet=self.pet, content='Hi!')
+            message = await sync_to_async(send)()
+            event = await asyncio.wait_for(subscription[1].get(), timeout=1)
+        finally:
+            realtime.broker.unsubscribe(topic, subscription)
+        self.assertEqual((event['type'], event['id'], event['content']), ('message', message.pk, 'Hi!'))
+
+    async def test_stream_delivers_events_over_sse(self):
+        await sync_to_async(self.async_client.force_login)(self.adopter)
+        response = await self.async_client.get(reverse('adoption:message_stream', args=[self.pet.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b': connected\n\n')
+        topic = realtime.conversation_topic(self.pet.pk, self.adopter.pk)
+        self.assertEqual(realtime.broker.subscriber_count(topic), 1)
+        realtime.broker.publish(topic, {'type': 'delete', 'id': 7, 'pet_id': self.pet.pk})
+        chunk = (await asyncio.wait_for(anext(chunks), timeout=1)).decode()
+        self.assertTrue(chunk.startswith('event: delete\n'))
+        self.assertEqual(json.loads(chunk.split('data: ')[1])['id'], 7)
+
+    async def test_closing_stream_unsubscribes(self):
+        topic = realtime.conversation_topic(self.pet.pk, self.adopter.pk)
+        stream = realtime.event_stream(topic)
+        # Nothing is subscribed until the response is actually sent.
+        self.assertEqual(realtime.broker.subscriber_count(topic), 0)
+        await anext(stream)
+        self.assertEqual(realtime.broker.subscriber_count(topic), 1)
+        await stream.aclose()
+        self.assertEqual(realtime.broker.subscriber_count(topic), 0)
+
+    async def test_stream_rejects_non_participants(self):
+        outsider = await sync_to_async(User.objects.create_user)('outsider', 'o@example.com', 'pass12345')
+        await sync_to_async(self.async_client.force_login)(outsider)
+        response = await self.async_client.get(reverse('adoption:message_stream', args=[self.pet.pk]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_chat_page_polls_under_wsgi(self):
+        self.client.force_login(self.adopter)
+        self.assertContains(self.client.get(reverse('adoption:messages', args=[self.pet.pk])), 'data-live-updates="poll"')
+
+    async def test_chat_page_streams_under_asgi(self):
+        await sync_to_async(self.async_client.force_login)(self.adopter)
+        response = await self.async_client.get(reverse('adoption:messages', args=[self.pet.pk]))
+        self.assertContains(response, 'data-live-updates="stream"')
+
+    def test_ajax_send_returns_message_json(self):
+        self.client.force_login(self.adopter)
+        response = self.client.post(
+            reverse('adoption:messages', args=[self.pet.pk]), {'content': 'Hello'},
+            headers={'x-requested-with': 'XMLHttpRequest'},
+        )
+        self.assertEqual(response.json()['message']['content'], 'Hello')
+
+
+class ConversationTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pet = make_pet(self.owner)
+        request = AdoptionRequest.objects.create(pet=self.pet, adopter=self.adopter)
+        self.client.force_login(self.owner)
+        self.client.post(reverse('adoption:approve_adoption', args=[request.pk]))
+        self.conversation = Conversation.objects.get(pet=self.pet, adopter=self.adopter)
+
+    def send(self, sender, receiver, content='hi'):
+        return Message.objects.create(sender=sender, receiver=receiver, pet=self.pet, content=content)
+
+    def test_messages_keep_counters_current(self):
+        self.send(self.owner, self.adopter)
+        last = self.send(self.owner, self.adopter, 'again')
+        self.send(self.adopter, self.owner)
+        self.conversation.refresh_from_db()
+        self.assertEqual((self.conversation.adopter_unread, self.conversation.owner_unread), (2, 1))
+        self.assertEqual(self.conversation.messages.count(), 3)
+        last.toggle_pin()
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.pinned_count, 1)
+
+    def test_viewing_chat_marks_it_read(self):
+        self.send(self.owner, self.adopter)
+        self.client.force_login(self.adopter)
+        self.client.get(reverse('adoption:messages', args=[self.pet.pk]))
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.adopter_unread, 0)
+
+    def test_delete_rolls_back_counters(self):
+        first = self.send(self.owner, self.adopter)
+        last = self.send(self.owner, self.adopter)
+        last.toggle_pin()
+        last.delete()
+        self.conversation.refresh_from_db()
+        self.assertEqual(
+            (self.conversation.last_message_id, self.conversation.pinned_count, self.conversation.adopter_unread),
+            (first.pk, 0, 1),
+        )
+
+    def test_dashboard_shows_unread_badge(self):
+        self.send(self.owner, self.adopter)
+        self.send(self.owner, self.adopter)
+        self.client.force_login(self.adopter)
+        response = self.client.get(reverse('adoption:dashboard'))
+        self.assertEqual(response.context['unread_total'], 2)
+        self.assertEqual([c.unread for c in response.context['conversations']], [2])
+
+    def test_owner_picks_conversation_by_adopter(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pass12345')
+        self.send(other, self.owner, 'question')
+        response = self.client.get(reverse('adoption:messages', args=[self.pet.pk]), {'with': other.pk})
+        self.assertEqual([m.content for m in response.context['chat_messages']], ['question'])
+        self.assertEqual(response.context['recipient'], other)
+        default = self.client.get(reverse('adoption:messages', args=[self.pet.pk]))
+        self.assertEqual(default.context['recipient'], self.adopter)
+
+    def test_outsider_cannot_send(self):
+        outsider = User.objects.create_user('outsider', 'o@example.com', 'pass12345')
+        self.client.force_login(outsider)
+        self.client.post(reverse('adoption:messages', args=[self.pet.pk]), {'content': 'spam'})
+        self.assertFalse(Message.objects.exists())
+
+
+class MessageSyncTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pet = make_pet(self.owner)
+        self.first = Message.objects.create(sender=self.owner, receiver=self.adopter, pet=self.pet, content='Hi')
+        self.second = Message.objects.create(sender=self.adopter, receiver=self.owner, pet=self.pet, content='Hello')
+        self.url = reverse('adoption:message_sync', args=[self.pet.pk])
+        self.client.force_login(self.adopter)
+
+    def sync(self, since=None, **headers):
+        return self.client.get(self.url, {'since': since} if since else {}, headers=headers)
+
+    def test_full_sync_returns_conversation_and_cursor(self):
+        data = self.sync().json()
+        self.assertEqual([m['id'] for m in data['messages']], [self.first.pk, self.second.pk])
+        self.assertEqual(data['deleted'], [])
+        self.assertEqual(data['cursor'], self.second.updated_at.isoformat())
+
+    def test_delta_contains_only_edits_and_deletions(self):
+        cursor = self.sync().json()['cursor']
+        self.first.content = 'Hi [Edited]'
+        self.first.save()
+        deleted_pk = self.second.pk
+        self.second.delete()
+        data = self.sync(cursor).json()
+        self.assertEqual([(m['id'], m['content']) for m in data['messages']], [(self.first.pk, 'Hi [Edited]')])
+        self.assertEqual(data['deleted'], [deleted_pk])
+        self.assertGreater(data['cursor'], cursor)
+        self.assertTrue(MessageTombstone.objects.filter(message_id=deleted_pk).exists())
+
+    def test_unchanged_conversation_answers_304(self):
+        response = self.sync()
+        again = self.sync(if_none_match=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        Message.objects.create(sender=self.owner, receiver=self.adopter, pet=self.pet, content='New')
+        self.assertEqual(self.sync(if_none_match=response['ETag']).status_code, 200)
+
+    def test_outsider_sees_nothing(self):
+        outsider = User.objects.create_user('outsider', 'o@example.com', 'pass12345')
+        self.client.force_login(outsider)
+        self.assertEqual(self.sync().json()['messages'], [])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self.sync('yesterday').status_code, 400)
+        self.assertEqual(self.sync('2020-02-30T00:00:00').status_code, 400)
+
+    def test_naive_cursor_is_read_in_the_current_time_zone(self):
+        cursor = timezone.make_naive(timezone.now() - timedelta(minutes=1)).isoformat()
+        data = self.sync(cursor).json()
+        self.assertEqual(len(data['messages']), 2)
+        self.assertFalse(data['resync'])
+
+    def test_cursor_older_than_the_tombstones_forces_a_resync(self):
+        self.second.delete()
+        MessageTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=40))
+        call_command('purge_message_tombstones', stdout=StringIO())
+        self.assertFalse(MessageTombstone.objects.exists())
+        data = self.sync((timezone.now() - timedelta(days=31)).isoformat()).json()
+        self.assertTrue(data['resync'])
+        self.assertEqual([m['id'] for m in data['messages']], [self.first.pk])
+
+    def test_row_committed_behind_the_cursor_is_still_sent(self):
+        cursor = self.sync().json()['cursor']
+        late = Message.objects.create(sender=self.owner, receiver=self.adopter, pet=self.pet, content='Slow commit')
+        # Stamped before a newer row was returned, committed after.
+        Message.objects.filter(pk=late.pk).update(updated_at=self.second.updated_at - timedelta(seconds=1))
+        data = self.sync(cursor).json()
+        self.assertIn(late.pk, [m['id'] for m in data['messages']])
+        self.assertEqual(data['cursor'], cursor)
+
+    def test_queryset_delete_leaves_tombstones(self):
+        cursor = self.sync().json()['cursor']
+        Message.objects.filter(pk__in=[self.first.pk, self.second.pk]).delete()
+        self.assertEqual(sorted(self.sync(cursor).json()['deleted']), [self.first.pk, self.second.pk])
+        conversation = Conversation.objects.get()
+        self.assertIsNone(conversation.last_message)
+        self.assertEqual((conversation.owner_unread, conversation.adopter_unread), (0, 0))
+
+    def test_deleting_the_pet_leaves_no_tombstones(self):
+        self.pet.delete()
+        self.assertFalse(MessageTombstone.objects.exists())
+
+
+class ImportPetsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.tmp.name)
+        self.override.enable()
+        self.owner = User.objects.create_user('shelter', 'shelter@example.com', 'pass12345')
+
+    def tearDown(self):
+        self.override.disable()
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'a') as f:
+            f.write(text)
+        return path
+
+    def run_import(self, path, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_pets', path, owner='shelter', batch_size=2, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_rows_are_validated_and_batched(self):
+        path = self.write('pets.csv', (
+            "name,breed,age,vaccination_status,pet_type,location,photo\n"
+            "Rex,Mixed,3,yes,dog,Pune,\n"
+            "Tom,Tabby,2,no,cat,Mumbai,\n"
+            "Bad,Mixed,old,no,dog,Pune,\n"
+            "Fluffy,Angora,1,0,dragon,Delhi,\n"
+            "Nemo,Clown,1,1,fish,Goa,\n"
+        ))
+        out, err = self.run_import(path)
+        self.assertIn('Imported 3 pets, rejected 2 rows', out)
+        self.assertIn('rows/s', out)
+        self.assertIn('Line 4: age', err)
+        self.assertIn('Line 5: pet_type', err)
+        self.assertEqual(set(Pet.objects.values_list('name', 'vaccination_status')), {('Rex', True), ('Tom', False), ('Nemo', True)})
+        self.client.force_login(self.owner)
+        self.assertContains(self.client.get(reverse('adoption:pet_list'), {'q': 'Nemo'}), 'Nemo')
+
+    def test_resumes_from_checkpoint(self):
+        path = self.write('pets.jsonl', json.dumps({'name': 'Rex', 'breed': 'Mixed', 'age': 3, 'pet_type': 'dog', 'location': 'Pune'}) + '\n')
+        self.run_import(path)
+        self.write('pets.jsonl', json.dumps({'name': 'Tom', 'breed': 'Tabby', 'age': 2, 'pet_type': 'cat', 'location': 'Goa'}) + '\n')
+        out, _ = self.run_import(path)
+        self.assertIn('Resuming after line 1', out)
+        self.assertEqual(sorted(Pet.objects.values_list('name', flat=True)), ['Rex', 'Tom'])
+
+    def test_crashed_import_resumes_without_duplicates(self):
+        rows = [{'name': name, 'breed': 'Mixed', 'age': 3, 'pet_type': 'dog', 'location': 'Pune'} for name in ('Rex', 'Max', 'Tom')]
+        path = self.write('pets.jsonl', ''.join(json.dumps(row) + '\n' for row in rows))
+        self.client.force_login(self.owner)
+        self.client.get(reverse('adoption:pet_list'))
+        bulk_create = Pet.objects.bulk_create
+
+        def crash_on_second_batch(pets, *args, **kwargs):
+            if any(pet.name == 'Tom' for pet in pets):
+                raise RuntimeError('killed')
+            return bulk_create(pets, *args, **kwargs)
+
+        with patch.object(Pet.objects, 'bulk_create', crash_on_second_batch), self.assertRaises(RuntimeError):
+            self.run_import(path)
+        # The committed batch is visible at once, not only after a run that finishes.
+        self.assertContains(self.client.get(reverse('adoption:pet_list')), 'Max')
+        out, _ = self.run_import(path)
+        self.assertIn('Resuming after line 2', out)
+        self.assertEqual(sorted(Pet.objects.values_list('name', flat=True)), ['Max', 'Rex', 'Tom'])
+
+    def test_malformed_json_lines_are_rejected(self):
+        rex = {'name': 'Rex', 'breed': 'Mixed', 'age': 3, 'pet_type': 'dog', 'location': 'Pune', 'photo': 7}
+        path = self.write('pets.jsonl', '{"name": "Max",\n[1, 2]\n' + json.dumps(rex) + '\n')
+        out, err = self.run_import(path)
+        self.assertIn('Imported 1 pets, rejected 2 rows', out)
+        self.assertIn('Line 1: invalid JSON', err)
+        self.assertIn('Line 2: not a JSON object', err)
+        self.assertIn('Line 3: photo skipped', err)
+        self.assertEqual(list(Pet.objects.values_list('name', flat=True)), ['Rex'])
+        self.assertEqual(ImportCheckpoint.objects.get().line, 3)
+
+    def test_photos_are_fetched_and_stored(self):
+        with open(os.path.join(self.tmp.name, 'rex.png'), 'wb') as f:
+            f.write(image_upload().read())
+        path = self.write('pets.csv', (
+            "name,breed,age,vaccination_status,pet_type,location,photo\n"
+            "Rex,Mixed,3,yes,dog,Pune,rex.png\n"
+            "Tom,Tabby,2,no,cat,Mumbai,missing.png\n"
+        ))
+        _, err = self.run_import(path, photo_root=self.tmp.name)
+        self.assertIn('Line 3: photo skipped', err)
+        rex = Pet.objects.get(name='Rex')
+        self.assertTrue(is_hashed_name(rex.photo.name))
+        self.assertIn(rex, images.pending_pets())
+        self.assertFalse(Pet.objects.get(name='Tom').photo)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pets = [make_pet(self.owner, name=f'Pet{i}') for i in range(3)]
+        for pet in self.pets:
+            AdoptionRequest.objects.create(pet=pet, adopter=self.adopter)
+        Message.objects.create(sender=self.adopter, receiver=self.owner, pet=self.pets[0], content='Hello, "friend"')
+
+    def test_admin_action_streams_selected_rows(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(admin_user)
+        selected = AdoptionRequest.objects.filter(pet__in=self.pets[:2])
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse('admin:adoption_adoptionrequest_changelist'), {
+                'action': 'export_csv', '_selected_action': [r.pk for r in selected],
+            })
+            self.assertTrue(response.streaming)
+            body = b''.join(response.streaming_content).decode()
+        lines = body.splitlines()
+        self.assertEqual(lines[0], 'id,pet_id,pet,owner,adopter_id,adopter,status,created_at,updated_at')
+        self.assertEqual(len(lines), 3)
+        self.assertIn('Pet0,owner', lines[1])
+        # One query for the export itself, joined rather than one per row.
+        exports = [q for q in captured.captured_queries if 'username' in q['sql'] and 'adoption_adoptionrequest' in q['sql']]
+        self.assertEqual(len(exports), 1)
+
+    def test_command_writes_jsonl(self):
+        out = StringIO()
+        call_command('export_data', 'messages', format='jsonl', chunk_size=1, stdout=out)
+        row = json.loads(out.getvalue())
+        self.assertEqual((row['sender'], row['receiver'], row['pet']), ('adopter', 'owner', 'Pet0'))
+        self.assertEqual(row['content'], 'Hello, "friend"')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'requests.csv')
+            call_command('export_data', 'requests', output=path, stderr=StringIO())
+            with open(path) as f:
+                self.assertEqual(len(f.read().splitlines()), 4)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pet = make_pet(self.owner, name='Bruno')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pass12345'))
+        self.url = reverse('admin:adoption_message_changelist')
+
+    def add_messages(self, count, content='Is Bruno still available?'):
+        for _ in range(count):
+            Message.objects.create(sender=self.adopter, receiver=self.owner, pet=self.pet, content=content)
+
+    def queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, len(captured.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_messages(2)
+        cache.clear()
+        _, few = self.queries(self.url)
+        cache.clear()
+        self.add_messages(20)
+        _, many = self.queries(self.url)
+        self.assertEqual(few, many)
+
+    def test_message_search_uses_full_text_index(self):
+        self.add_messages(1, 'Does she like walks?')
+        self.add_messages(1, 'What about vaccinations?')
+        response, _ = self.queries(self.url, {'q': 'vaccin'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        Message.objects.filter(content__startswith='What').update(content='ignored')
+        self.assertEqual(self.queries(self.url, {'q': 'walks'})[0].context['cl'].result_count, 1)
+
+    def test_username_filter_and_capped_location_facets(self):
+        self.add_messages(2)
+        Message.objects.create(sender=self.owner, receiver=self.adopter, pet=self.pet, content='Yes')
+        response, _ = self.queries(self.url, {'sender_username': 'owner'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertContains(response, 'name="sender_username" value="owner"')
+        for i in range(25):
+            make_pet(self.owner, location=f'Town{i:02d}')
+        response, _ = self.queries(reverse('admin:adoption_pet_changelist'))
+        locations = next(spec for spec in response.context['cl'].filter_specs if getattr(spec, 'parameter_name', None) == 'location')
+        self.assertEqual(len(locations.lookup_choices), 20)
+        self.assertEqual(locations.lookup_choices[0], ('Pune', 'Pune'))
+
+
+class GeoSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.client.force_login(self.owner)
+
+    def test_locations_are_geocoded_on_save(self):
+        pet = make_pet(self.owner, location='Poona, Maharashtra')
+        self.assertEqual((pet.latitude, pet.longitude), geo.geocode('Pune'))
+        self.assertEqual(pet.geo_cell, geo.cell_for(pet.latitude, pet.longitude))
+        pet.location = 'Atlantis'
+        pet.save(update_fields=['location'])
+        pet.refresh_from_db()
+        self.assertIsNone(pet.geo_cell)
+
+    def test_radius_filter_sorts_by_distance_and_pages(self):
+        for name, location in [('Far', 'Mumbai'), ('Here', 'Pune'), ('Near', 'Lonavala'), ('Unknown', 'Atlantis')]:
+            make_pet(self.owner, name=name, location=location)
+        url = reverse('adoption:pet_list_json')
+        results = self.client.get(url, {'near': 'Pune', 'radius': 100}).json()['results']
+        self.assertEqual([pet['name'] for pet in results], ['Here', 'Near'])
+        self.assertAlmostEqual(results[1]['distance_km'], geo.haversine_km(*geo.geocode('Pune'), *geo.geocode('Lonavala')))
+        with patch.object(views, 'PETS_PER_PAGE', 2):
+            first = self.client.get(url, {'near': 'Pune', 'radius': 200}).json()
+            second = self.client.get(url + '?' + first['next_page_query']).json()
+        self.assertEqual([p['name'] for p in first['results'] + second['results']], ['Here', 'Near', 'Far'])
+        self.assertContains(self.client.get(reverse('adoption:pet_list'), {'near': 'Atlantis'}), 'find "Atlantis"')
+        self.assertEqual(self.client.get(reverse('adoption:pet_list'), {'lat': 'north', 'lon': '1'}).status_code, 400)
+
+    def test_pages_are_bounded_and_ordered_in_sql(self):
+        for i, location in enumerate(['Mumbai', 'Pune', 'Lonavala', 'Pune', 'Atlantis']):
+            make_pet(self.owner, name=f'Pet {i}', location=location)
+        pune = geo.geocode('Pune')
+        names, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as captured:
+                items, cursor = geo.nearby_page(Pet.objects.all(), *pune, 200, cursor=cursor, page_size=1)
+            self.assertEqual(len(captured), 1)
+            self.assertIn('LIMIT 2', captured[0]['sql'])
+            names += [pet.name for pet in items]
+            if not cursor:
+                break
+        self.assertEqual(names, ['Pet 1', 'Pet 3', 'Pet 2', 'Pet 0'])
+
+    def test_candidates_come_from_the_grid_index(self):
+        pets = Pet.objects.filter(geo.within_cells(18.52, 73.86, 25))
+        with connection.cursor() as cursor:
+            sql, params = pets.values_list('id', 'latitude', 'longitude').query.sql_with_params()
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('pet_geo_cell_idx', plan)
+        self.assertNotIn('SCAN adoption_pet', plan)
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.client.force_login(self.owner)
+        make_pet(self.owner, name='Rex', vaccination_status=True)
+        make_pet(self.owner, name='Rover', location='Mumbai').mark_adopted(self.adopter)
+        make_pet(self.owner, name='Tom', pet_type='cat', location='Mumbai')
+
+    def test_counts_follow_the_filters_except_pet_type(self):
+        url = reverse('adoption:pet_list')
+        facets = self.client.get(url, {'pet_type': 'dog'}).context['facets']
+        self.assertEqual(dict((value, count) for value, _, count in facets['pet_types'])['cat'], 1)
+        self.assertEqual((facets['total'], facets['vaccinated_percent'], facets['adopted'], facets['available']), (2, 50, 1, 1))
+        self.assertEqual(facets['locations'], [('Mumbai', 1), ('Pune', 1)])
+        self.assertEqual(self.client.get(url, {'q': 'ro'}).context['facets']['total'], 1)
+
+    def test_counts_are_shared_across_types_until_a_pet_changes(self):
+        url = reverse('adoption:pet_list')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as captured:
+            facets = self.client.get(url, {'pet_type': 'cat'}).context['facets']
+        self.assertFalse([q for q in captured.captured_queries if 'COUNT' in q['sql']])
+        self.assertEqual((facets['total'], facets['adopted'], facets['available']), (1, 0, 1))
+        self.assertEqual(facets['locations'], [('Mumbai', 1)])
+        make_pet(self.owner, name='Kitty', pet_type='cat')
+        self.assertEqual(self.client.get(url).context['facets']['total'], 4)
+
+    def test_location_without_searchable_terms_matches_nothing(self):
+        response = self.client.get(reverse('adoption:pet_list'), {'location': '!!!'})
+        self.assertEqual(list(response.context['pets']), [])
+        self.assertEqual(response.context['facets']['total'], 0)
+
+    def test_cached_counts_stay_bounded_by_location(self):
+        for i in range(facets.TOP_LOCATIONS * 3):
+            make_pet(self.owner, name=f'Stray {i}', location=f'Town {i}')
+        counts = facets.facet_counts(Pet.objects.all())
+        self.assertEqual(len(counts['types']), 2)
+        self.assertEqual(len(counts['locations']), facets.TOP_LOCATIONS)
+        self.assertLessEqual(len(counts['type_locations']), 2 * facets.TOP_LOCATIONS)
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.adopter = User.objects.create_user('adopter', 'adopter@example.com', 'pass12345')
+        self.pet = make_pet(self.owner)
+        self.client.force_login(self.adopter)
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('adoption:pet_list'))
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{len(captured)} queries"', timing)
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertRegex(timing, r'cache;desc="\d+ hits, \d+ misses"')
+        # Queuing the email is one INSERT, counted under db; send_queued_mail reports the sending.
+        response = self.client.post(reverse('adoption:apply_adoption', args=[self.pet.pk]))
+        self.assertNotIn('mail;', response['Server-Timing'])
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_server_timing_header_can_be_turned_off(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('adoption:pet_list')))
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_their_worst_queries(self):
+        with self.assertLogs('adoption.perf', 'WARNING') as logs:
+            self.client.get(reverse('adoption:pet_detail', args=[self.pet.pk]))
+        entry = json.loads(logs.output[-1].split('Slow request: ', 1)[1])
+        self.assertEqual((entry['path'], entry['status']), (reverse('adoption:pet_detail', args=[self.pet.pk]), 200))
+        self.assertTrue(entry['worst_queries'])
+        self.assertGreater(entry['template_ms'], 0)
+
+    def test_sampled_profiles(self):
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with override_settings(PERF_PROFILE_SAMPLE_RATE=1, PERF_PROFILE_DIR=profile_dir):
+                self.client.get(reverse('adoption:home'))
+            self.assertEqual(len([name for name in os.listdir(profile_dir) if name.endswith('.prof')]), 1)
+
+
+class DatabaseProfileTests(TestCase):
+    def test_read_only_views_read_from_the_replica(self):
+        router = db.ReadOnlyViewRouter()
+        seen = db.read_only_view(lambda: router.db_for_read(Pet))()
+        self.assertEqual((seen, router.db_for_read(Pet), router.db_for_write(Pet)), (db.READ_ALIAS, None, 'default'))
+        self.assertFalse(router.allow_migrate(db.READ_ALIAS, 'adoption'))
+        replica = db.production_databases('db.sqlite3')[db.READ_ALIAS]['OPTIONS']
+        self.assertIn('query_only = ON', replica['init_command'])
+        self.assertNotIn('transaction_mode', replica)
+
+    def test_concurrent_writers_never_see_locks_in_production(self):
+        # A separate process: the test case only lets threads connect to its own databases.
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'stress_sqlite', '--writers', '8', '--readers', '2', '--transactions', '20'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        results = {result['profile']: result for result in json.loads(result.stdout)}
+        production = results['production']
+        self.assertEqual(production['journal_mode'], 'wal')
+        self.assertEqual((production['lock_errors'], production['read_lock_errors']), (0, 0))
+        self.assertEqual(production['committed'], production['attempted'])
+        self.assertTrue(production['consistent'])
+
+
+def pretend_cache_is_shared(test, shared=True):
+    # Redis is not installed here, so the tiered cache runs on its per-process fallback.
+    for target in ('accounts.backends.is_shared', 'accounts.sessions.is_shared'):
+        patcher = patch(target, return_value=shared)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+
+class SessionAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        pretend_cache_is_shared(self)
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pass12345')
+        self.url = reverse('adoption:pet_list')
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in captured.captured_queries if 'django_session' in q['sql'] or '"auth_user"' in q['sql']]
+
+    def test_warm_request_skips_session_and_user_queries(self):
+        self.client.force_login(self.owner)
+        self.client.get(self.url)
+        self.assertEqual(self.auth_queries(), [])
+        with override_settings(AUTH_USER_CACHE_SECONDS=0):
+            self.assertEqual(len(self.auth_queries()), 1)
+
+    def test_cached_user_has_no_password_hash(self):
+        self.client.force_login(self.owner)
+        self.client.get(self.url)
+        self.assertNotIn(self.owner.password, repr(cache.get(f'auth:user:{self.owner.pk}')))
+        user = self.client.get(self.url).wsgi_request.user
+        user.first_name = 'Renamed'
+        user.save()
+        self.assertTrue(User.objects.get(pk=self.owner.pk).check_password('pass12345'))
+
+    def test_process_local_cache_is_bypassed(self):
+        pretend_cache_is_shared(self, shared=False)
+        self.client.force_login(self.owner)
+        self.client.get(self.url)
+        self.assertEqual(len(self.auth_queries()), 2)
+
+    def test_password_change_ends_cached_login(self):
+        self.client.force_login(self.owner)
+        self.client.get(self.url)
+        self.owner.set_password('new-pass12345')
+        self.owner.save()
+        self.assertRedirects(self.client.get(self.url), f"{reverse('accounts:login')}?next={self.url}")
+
+    def test_logins_from_before_the_cached_backend_survive(self):
+        self.client.force_login(self.owner, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_every_session_mode_keeps_the_login(self):
+        for mode, engine in settings.SESSION_ENGINES.items():
+            with self.subTest(mode=mode), override_settings(SESSION_ENGINE=engine):
+                self.client = self.client_class()
+                self.client.force_login(self.owner)
+                self.client.get(self.url)
+                queries = self.auth_queries()
+                self.assertEqual(len(queries), 1 if mode == 'db' else 0, queries)
+
+    def test_purge_sessions_deletes_only_expired_rows(self):
+        now = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+        out = StringIO()
+        call_command('purge_sessions', batch_size=2, stdout=out)
+        self.assertIn('Deleted 5 expired sessions.', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+class ScaleBenchmarkTests(TransactionTestCase):
+    # The benchmark's worker threads open their own connections, which only see committed rows.
+
+    def test_seed_and_benchmark_every_url(self):
+        call_command('seed_scale', users=20, pets=50, requests=100, messages=200, stories=5, stdout=StringIO())
+        self.assertEqual(Conversation.objects.count(), 5)
+        self.assertEqual(Conversation.objects.filter(last_message__isnull=True).count(), 0)
+        self.assertEqual(Message.objects.count(), 200)
+        out = StringIO()
+        call_command('benchmark_views', requests=2, workers=1, warmup=0, stdout=out)
+        report = json.loads(out.getvalue())
+        names = {result['name'] for result in report['results']} | {skip['name'] for skip in report['skipped']}
+        self.assertTrue({'adoption:pet_list', 'adoption:messages', 'accounts:login', 'accounts:reset_password'} <= names)
+        for result in report['results']:
+            self.assertEqual(result['errors'], 0, result)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+        self.assertEqual(report['rows']['Pet'], 50)
+
+        out = StringIO()
+        pretend_cache_is_shared(self)
+        call_command('benchmark_sessions', requests=2, workers=1, stdout=out)
+        results = {(result['session_mode'], result['user_cache']): result for result in json.loads(out.getvalue())['results']}
+        self.assertEqual(len(results), len(settings.SESSION_ENGINES) * 2)
+        self.assertTrue(all(result['errors'] == 0 for result in results.values()))
+        self.assertEqual(results['db', False]['queries']['max'], 2)
+        self.assertEqual(results['signed_cookies', True]['queries']['max'], 0)
@@ -5,6 +5,7 @@ app_name = 'adoption'
 urlpatterns = [
     path('', views.home, name='home'),
     path('pets/', views.pet_list, name='pet_list'),
+    path('pets/json/', views.pet_list_json, name='pet_list_json'),
     path('pet/<int:pk>/', views.pet_detail, name='pet_detail'),
     path('pet/add/', views.pet_form, name='pet_form'),
     path('dashboard/', views.dashboard, name='dashboard'),
@@ -13,6 +14,9 @@ urlpatterns = [
     path('request/<int:pk>/approve/', views.approve_adoption, name='approve_adoption'),
     path('request/<int:pk>/reject/', views.reject_adoption, name='reject_adoption'),
     path('messages/<int:pet_pk>/', views.messages, name='messages'),
+    path('messages/<int:pet_pk>/stream/', views.message_stream, name='message_stream'),
+    path('messages/<int:pet_pk>/sync/', views.message_sync, name='message_sync'),
     path('pet/<int:pet_id>/applicants/', views.applicants_list, name='applicants'),
     path('messages/edit/<int:message_id>/', views.edit_message, name='edit_message'),
+    path('analytics/', views.analytics_dashboard, name='analytics_dashboard'),
 ]
\ No newline at end of file
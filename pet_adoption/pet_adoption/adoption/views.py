@@ -1,36 +1,218 @@
 import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db import models
-from django.core.mail import send_mail
-from PIL import Image
-from io import BytesIO
-from django.core.files.uploadedfile import InMemoryUploadedFile
-from .models import Pet, AdoptionRequest, SuccessStory, Message, User
+from django.db import models, transaction
+from .models import Pet, AdoptionRequest, SuccessStory, Conversation, Message, MessageTombstone, User
 from .forms import PetForm, MessageForm
+from .pagination import keyset_page, DeferredPage, InvalidCursor
+from . import analytics, facets, geo, search
+from .outbox import queue_mail
+from .conditional import conditional_page
+from .db import read_only_view
+from .caching import (
+    attach_card_versions, cached_pet, cached_pet_facets, cached_pet_page, cached_success_stories, dashboard_version,
+    pet_list_generation,
+    DASHBOARD_CACHE_SECONDS, PET_CARD_CACHE_SECONDS,
+)
+from .storage import is_hashed_name, IMMUTABLE_CACHE_CONTROL
+from .realtime import conversation_topic, event_stream, message_event
 from django.contrib import messages as django_messages
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.conf import settings
+from django.views.static import serve
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import condition
+from django.middleware.csrf import get_token
+from django.core.handlers.asgi import ASGIRequest
+from django.templatetags.static import static
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+PETS_PER_PAGE = 24
+DEFAULT_RADIUS_KM = 25
+INBOX_SIZE = 20
+DASHBOARD_PAGE_SIZE = 10
+
+def _home_version(request):
+    return None, ''
+
+@conditional_page(_home_version)
 def home(request):
     return render(request, 'home.html')
 
-@login_required
-def pet_list(request):
+def _near(request):
+    """(latitude, longitude, radius_km) from ?near=<place> or ?lat=&lon=, or None."""
+    near = request.GET.get('near', '').strip()
+    if not near and not (request.GET.get('lat') and request.GET.get('lon')):
+        return None
+    try:
+        radius = min(float(request.GET.get('radius') or DEFAULT_RADIUS_KM), geo.MAX_RADIUS_KM)
+        point = None if near else (float(request.GET['lat']), float(request.GET['lon']))
+    except ValueError as e:
+        raise geo.InvalidQuery("Invalid location or radius.") from e
+    if near:
+        point = geo.geocode(near)
+        if point is None:
+            raise geo.UnknownPlace(near)
+    if not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180 and radius > 0):
+        raise geo.InvalidQuery("Invalid location or radius.")
+    return (*point, radius)
+
+def _pet_page(request):
+    near = _near(request)
+    filters = tuple(request.GET.get(name) for name in ('q', 'pet_type', 'location', 'cursor')) + (near,)
+    return cached_pet_page(filters, lambda: _query_pet_page(request, near))
+
+def _query_pet_page(request, near=None):
     pets = Pet.objects.all()
+    query = request.GET.get('q')
     pet_type = request.GET.get('pet_type')
     location = request.GET.get('location')
+    cursor = request.GET.get('cursor')
+    if near:
+        # Distance replaces the location text filter and orders the results.
+        if pet_type:
+            pets = pets.filter(pet_type=pet_type)
+        match = search.build_match(query) if search.is_available() else None
+        if match:
+            pets = pets.filter(pk__in=search.matching_ids(search.TABLE, match))
+        elif query:
+            pets = pets.filter(models.Q(name__icontains=query) | models.Q(breed__icontains=query))
+        return geo.nearby_page(pets, *near, cursor=cursor, page_size=PETS_PER_PAGE)
+    if _unsearchable_location(location):
+        return [], None
+    if search.is_available():
+        match = search.build_match(query, location=location, pet_type=pet_type)
+        if match:
+            return search.search_page(pets, match, cursor, PETS_PER_PAGE)
+    else:
+        if query:
+            pets = pets.filter(models.Q(name__icontains=query) | models.Q(breed__icontains=query))
+        if location:
+            pets = pets.filter(location__icontains=location)
     if pet_type:
         pets = pets.filter(pet_type=pet_type)
+    return keyset_page(pets, cursor, PETS_PER_PAGE)
+
+def _unsearchable_location(location):
+    # A location of punctuation only has no words to match in the search index; it
+    # finds nothing rather than being dropped and showing every pet.
+    return bool(location and location.strip()) and search.is_available() and not search.has_terms(location)
+
+def _pet_facets(request, near=None):
+    # The cached counts are keyed without the cursor, so every page of one search shares
+    # them, and without pet_type, which is applied to them after the lookup.
+    filters = tuple(request.GET.get(name) for name in ('q', 'location')) + (near,)
+    counts = cached_pet_facets(filters, lambda: facets.facet_counts(_facet_queryset(request, near)))
+    return facets.pet_facets(counts, request.GET.get('pet_type'))
+
+def _facet_queryset(request, near=None):
+    pets = Pet.objects.all()
+    query = request.GET.get('q')
+    location = None if near else request.GET.get('location')
+    if near:
+        # The grid cells around the point: a square rather than the exact circle,
+        # which is close enough for counts.
+        pets = pets.filter(geo.within_cells(*near))
+    if _unsearchable_location(location):
+        return pets.none()
+    match = search.build_match(query, location=location) if search.is_available() else None
+    if match:
+        return pets.filter(pk__in=search.matching_ids(search.TABLE, match))
+    if query:
+        pets = pets.filter(models.Q(name__icontains=query) | models.Q(breed__icontains=query))
     if location:
         pets = pets.filter(location__icontains=location)
-    return render(request, 'pet_list.html', {'pets': pets})
+    return pets
+
+def _next_page_query(request, next_cursor):
+    if not next_cursor:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = next_cursor
+    return params.urlencode()
+
+def _pet_list_version(request):
+    # The list generation is the time_ns of the last pet save or delete, so it is
+    # the page's modification time without a query.
+    generation = pet_list_generation()
+    return datetime.fromtimestamp(generation / 1e9, tz=dt_timezone.utc), generation
+
+@login_required
+@conditional_page(_pet_list_version)
+@read_only_view
+def pet_list(request):
+    unknown_place = False
+    try:
+        pets, next_cursor = _pet_page(request)
+        facet_counts = _pet_facets(request, _near(request))
+    except InvalidCursor:
+        return HttpResponseBadRequest("Invalid cursor.")
+    except geo.UnknownPlace:
+        pets, next_cursor, unknown_place, facet_counts = [], None, True, None
+    except geo.InvalidQuery as e:
+        return HttpResponseBadRequest(str(e))
+    return render(request, 'pet_list.html', {
+        'pets': attach_card_versions(pets),
+        'card_cache_seconds': PET_CARD_CACHE_SECONDS,
+        'pet_types': Pet.PET_TYPES,
+        'facets': facet_counts,
+        'query': request.GET.get('q', ''),
+        'pet_type': request.GET.get('pet_type', ''),
+        'location': request.GET.get('location', ''),
+        'near': request.GET.get('near', ''),
+        'radius': request.GET.get('radius') or str(DEFAULT_RADIUS_KM),
+        'radius_choices': geo.RADIUS_CHOICES,
+        'unknown_place': unknown_place,
+        'next_page_query': _next_page_query(request, next_cursor),
+    })
+
+@login_required
+@read_only_view
+def pet_list_json(request):
+    try:
+        pets, next_cursor = _pet_page(request)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    except geo.UnknownPlace as e:
+        return JsonResponse({'error': f'Unknown place: {e}'}, status=400)
+    except geo.InvalidQuery as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'results': [{
+            'id': pet.pk,
+            'name': pet.name,
+            'breed': pet.breed,
+            'age': pet.age,
+            'pet_type': pet.pet_type,
+            'location': pet.location,
+            'distance_km': getattr(pet, 'distance_km', None),
+            'is_adopted': pet.is_adopted(),
+            'photo_url': pet.card_url or static('images/pet-placeholder.svg'),
+            'jpeg_srcset': pet.jpeg_srcset,
+            'webp_srcset': pet.webp_srcset,
+            'detail_url': reverse('adoption:pet_detail', args=[pet.pk]),
+        } for pet in pets],
+        'next_cursor': next_cursor,
+        'next_page_query': _next_page_query(request, next_cursor),
+    })
+
+def _pet_detail_version(request, pk):
+    pet = cached_pet(pk)
+    return (pet.updated_at if pet else None), ''
 
 @login_required
+@conditional_page(_pet_detail_version)
+@read_only_view
 def pet_detail(request, pk):
-    pet = get_object_or_404(Pet, pk=pk)
+    pet = cached_pet(pk)
+    if pet is None:
+        raise Http404("No Pet matches the given query.")
     return render(request, 'pet_detail.html', {'pet': pet})
 
 @login_required
@@ -40,13 +222,7 @@ def pet_form(request):
         if form.is_valid():
             pet = form.save(commit=False)
             pet.owner = request.user
-            if pet.photo:
-                image = Image.open(pet.photo)
-                image = image.resize((800, 800), Image.Resampling.LANCZOS)
-                output = BytesIO()
-                image.save(output, format='JPEG', quality=85)
-                output.seek(0)
-                pet.photo = InMemoryUploadedFile(output, 'ImageField', f"{pet.photo.name.split('.')[0]}.jpg", 'image/jpeg', output.getbuffer().nbytes, None)
+            # Resizing happens off-request in `manage.py process_pet_photos`.
             pet.save()
             return redirect('adoption:pet_list')
     else:
@@ -56,13 +232,47 @@ def pet_form(request):
 @login_required
 def dashboard(request):
     if request.user.is_authenticated:
-        owned_pets = Pet.objects.filter(owner=request.user)
-        adoption_requests = AdoptionRequest.objects.filter(adopter=request.user)
-        owner_requests = AdoptionRequest.objects.filter(pet__owner=request.user)
+        # Sections are bounded keyset pages whose queries only run when their cached
+        # fragment is missing.
+        try:
+            owned_pets = DeferredPage(
+                Pet.objects.filter(owner=request.user),
+                request.GET.get('pets_cursor'), DASHBOARD_PAGE_SIZE, prepare=attach_card_versions,
+            )
+            adoption_requests = DeferredPage(
+                AdoptionRequest.objects.filter(adopter=request.user).select_related('pet'),
+                request.GET.get('requests_cursor'), DASHBOARD_PAGE_SIZE,
+            )
+            owner_requests = DeferredPage(
+                AdoptionRequest.objects.filter(pet__owner=request.user).select_related('pet', 'adopter'),
+                request.GET.get('incoming_cursor'), DASHBOARD_PAGE_SIZE,
+            )
+        except InvalidCursor:
+            return HttpResponseBadRequest("Invalid cursor.")
+        participant = models.Q(owner=request.user) | models.Q(adopter=request.user)
+        unread = models.Case(
+            models.When(owner=request.user, then='owner_unread'), default='adopter_unread',
+        )
+        conversations = (
+            Conversation.objects.filter(participant, last_message__isnull=False)
+            .select_related('pet', 'owner', 'adopter', 'last_message')
+            .annotate(unread=unread)
+            .order_by('-last_message_at')[:INBOX_SIZE]
+        )
+        unread_total = Conversation.objects.filter(participant).aggregate(total=models.Sum(unread))['total'] or 0
+        # The incoming-requests fragment embeds CSRF tokens, so it is cached per CSRF secret;
+        # get_token() also sends the cookie to browsers that do not have one yet.
+        get_token(request)
         return render(request, 'dashboard.html', {
             'owned_pets': owned_pets,
             'adoption_requests': adoption_requests,
-            'owner_requests': owner_requests
+            'owner_requests': owner_requests,
+            'conversations': conversations,
+            'unread_total': unread_total,
+            'dashboard_version': dashboard_version(request.user.pk),
+            'csrf_secret': request.META['CSRF_COOKIE'],
+            'dashboard_cache_seconds': DASHBOARD_CACHE_SECONDS,
+            'card_cache_seconds': PET_CARD_CACHE_SECONDS,
         })
     return redirect('accounts:login')
 
@@ -72,14 +282,14 @@ def apply_adoption(request, pk):
     if request.user == pet.owner:
         return redirect('adoption:pet_detail', pk=pk)
     if request.method == 'POST':
-        AdoptionRequest.objects.create(pet=pet, adopter=request.user)
-        send_mail(
-            'New Adoption Request',
-            f'A new adoption request has been submitted for your pet {pet.name} by {request.user.username}.',
-            'from@example.com',
-            [pet.owner.email],
-            fail_silently=False,
-        )
+        with transaction.atomic():
+            AdoptionRequest.objects.create(pet=pet, adopter=request.user)
+            queue_mail(
+                'New Adoption Request',
+                f'A new adoption request has been submitted for your pet {pet.name} by {request.user.username}.',
+                'from@example.com',
+                [pet.owner.email],
+            )
         return redirect('adoption:dashboard')
     return render(request, 'pet_detail.html', {'pet': pet})
 
@@ -87,16 +297,18 @@ def apply_adoption(request, pk):
 def approve_adoption(request, pk):
     adoption_request = get_object_or_404(AdoptionRequest, pk=pk)
     if request.user == adoption_request.pet.owner and request.method == 'POST':
-        adoption_request.status = 'approved'
-        adoption_request.save()
-        SuccessStory.objects.create(pet=adoption_request.pet, adopter=adoption_request.adopter, story="Adoption approved!")
-        send_mail(
-            'Adoption Request Approved',
-            f'Your adoption request for {adoption_request.pet.name} has been approved!',
-            'from@example.com',
-            [adoption_request.adopter.email],
-            fail_silently=False,
-        )
+        with transaction.atomic():
+            adoption_request.status = 'approved'
+            adoption_request.save()
+            adoption_request.pet.mark_adopted(adoption_request.adopter)
+            Conversation.open(adoption_request.pet, adoption_request.adopter_id)
+            SuccessStory.objects.create(pet=adoption_request.pet, adopter=adoption_request.adopter, story="Adoption approved!")
+            queue_mail(
+                'Adoption Request Approved',
+                f'Your adoption request for {adoption_request.pet.name} has been approved!',
+                'from@example.com',
+                [adoption_request.adopter.email],
+            )
         return redirect('adoption:applicants', pet_id=adoption_request.pet.pk)
     return redirect('adoption:dashboard')
 
@@ -104,50 +316,65 @@ def approve_adoption(request, pk):
 def reject_adoption(request, pk):
     adoption_request = get_object_or_404(AdoptionRequest, pk=pk)
     if request.user == adoption_request.pet.owner and request.method == 'POST':
-        adoption_request.status = 'rejected'
-        adoption_request.save()
-        send_mail(
-            'Adoption Request Rejected',
-            f'Your adoption request for {adoption_request.pet.name} has been rejected.',
-            'from@example.com',
-            [adoption_request.adopter.email],
-            fail_silently=False,
-        )
+        with transaction.atomic():
+            was_approved = adoption_request.status == 'approved'
+            adoption_request.status = 'rejected'
+            adoption_request.save()
+            pet = adoption_request.pet
+            if was_approved and pet.adopter_id == adoption_request.adopter_id:
+                # Another approval still standing keeps the pet adopted, by its adopter.
+                remaining = (
+                    AdoptionRequest.objects.filter(pet=pet, status='approved')
+                    .select_related('adopter').order_by('-updated_at').first()
+                )
+                if remaining:
+                    pet.adopter = remaining.adopter
+                    pet.save(update_fields=['adopter', 'updated_at'])
+                else:
+                    pet.mark_available()
+            queue_mail(
+                'Adoption Request Rejected',
+                f'Your adoption request for {adoption_request.pet.name} has been rejected.',
+                'from@example.com',
+                [adoption_request.adopter.email],
+            )
         return redirect('adoption:applicants', pet_id=adoption_request.pet.pk)
     return redirect('adoption:dashboard')
 
+def _conversation_for(request, pet):
+    """The conversation the user is looking at for this pet, or None.
+
+    Owners see the chat with the adopter picked in the inbox (?with=<user id>),
+    defaulting to the pet's current adopter.
+    """
+    conversations = Conversation.objects.filter(pet=pet).select_related('owner', 'adopter')
+    if request.user.pk != pet.owner_id:
+        return conversations.filter(adopter=request.user).first()
+    adopter_id = request.GET.get('with') or pet.adopter_id
+    if not str(adopter_id or '').isdigit():
+        return None
+    return conversations.filter(adopter_id=adopter_id).first()
+
 @login_required
 def messages(request, pet_pk):
     pet = get_object_or_404(Pet, pk=pet_pk)
-    chat_messages = Message.objects.filter(pet=pet).filter(
-        models.Q(sender=request.user) | models.Q(receiver=request.user)
-    ).order_by('-is_pinned', 'created_at')
-
-    can_send_messages = (
-        request.user == pet.owner
-        or chat_messages.filter(receiver=request.user).exists()
-        or AdoptionRequest.objects.filter(pet=pet, adopter=request.user, status='approved').exists()
-    )
-
-    recipient = None
-    if request.user == pet.owner:
-        approved_request = AdoptionRequest.objects.filter(pet=pet, status='approved').first()
-        if approved_request:
-            recipient = approved_request.adopter
+    conversation = _conversation_for(request, pet)
+    if conversation:
+        chat_messages = conversation.messages.select_related('sender').order_by('-is_pinned', 'created_at')
+        recipient = conversation.other_participant(request.user)
     else:
-        recipient = pet.owner
-
-    has_pinned_messages = chat_messages.filter(is_pinned=True).exists()
+        chat_messages = Message.objects.none()
+        recipient = None if request.user.pk == pet.owner_id else pet.owner
+    can_send_messages = request.user.pk == pet.owner_id or conversation is not None
+    has_pinned_messages = bool(conversation and conversation.pinned_count)
 
     if request.method == 'POST':
-        logger.info(f"POST request to /messages/{pet_pk}/ with data: {request.POST}")
         # Handle pin/unpin request
         if 'pin_message_id' in request.POST:
             try:
                 message_id = request.POST.get('pin_message_id')
                 message = get_object_or_404(Message, id=message_id, sender=request.user)
-                message.is_pinned = not message.is_pinned
-                message.save()
+                message.toggle_pin()
                 return JsonResponse({
                     'success': True,
                     'is_pinned': message.is_pinned
@@ -177,36 +404,128 @@ def messages(request, pet_pk):
             message = form.save(commit=False)
             message.sender = request.user
             message.pet = pet
-            if request.user == pet.owner:
-                approved_request = AdoptionRequest.objects.filter(pet=pet, status='approved').first()
-                if approved_request:
-                    message.receiver = approved_request.adopter
-                else:
-                    django_messages.error(request, "No approved adopter found for this pet.")
-                    return redirect('adoption:messages', pet_pk=pet.pk)
-            else:
-                message.receiver = pet.owner
+            if conversation is None:
+                django_messages.error(request, "No approved adopter found for this pet.")
+                return redirect('adoption:messages', pet_pk=pet.pk)
+            message.conversation = conversation
+            message.receiver = recipient
             if message.receiver:
-                message.save()
-                send_mail(
-                    'New Message Received',
-                    f'You have received a new message regarding {pet.name} from {message.sender.username}.',
-                    'from@example.com',
-                    [message.receiver.email],
-                    fail_silently=False,
-                )
+                with transaction.atomic():
+                    message.save()
+                    queue_mail(
+                        'New Message Received',
+                        f'You have received a new message regarding {pet.name} from {message.sender.username}.',
+                        'from@example.com',
+                        [message.receiver.email],
+                    )
+                if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                    return JsonResponse({'success': True, 'message': message_event('message', message)})
                 django_messages.success(request, "Your message was sent!")
-            return redirect('adoption:messages', pet_pk=pet.pk)
+            return redirect(request.get_full_path())
     else:
         form = MessageForm()
+        if conversation:
+            conversation.mark_read(request.user)
 
     return render(request, 'messages.html', {
         'pet': pet,
+        'conversation': conversation,
         'chat_messages': chat_messages,
         'form': form,
         'can_send_messages': can_send_messages,
         'recipient': recipient,
         'has_pinned_messages': has_pinned_messages,
+        # Under WSGI an open stream holds a worker thread for as long as the tab is
+        # open, so the page polls message_sync instead.
+        'live_updates': isinstance(request, ASGIRequest),
+    })
+
+def _stream_user_id(request, pet_pk):
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    pet = Pet.objects.filter(pk=pet_pk).first()
+    if pet is None:
+        return None
+    is_participant = user.pk == pet.owner_id or Conversation.objects.filter(pet=pet, adopter=user).exists()
+    return user.pk if is_participant else None
+
+async def message_stream(request, pet_pk):
+    """Server-Sent Events stream of new, edited, pinned and deleted messages for one chat.
+
+    Needs an ASGI server (e.g. `uvicorn pet_adoption.asgi:application`) to hold many
+    streams open cheaply; events are fanned out by the in-process broker.
+    """
+    user_id = await sync_to_async(_stream_user_id)(request, pet_pk)
+    if user_id is None:
+        return HttpResponseForbidden()
+    topic = conversation_topic(pet_pk, user_id)
+    response = StreamingHttpResponse(event_stream(topic), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+# How far behind the client's cursor message_sync looks again. updated_at is stamped
+# before commit, so a slow transaction can commit a row older than one already returned.
+SYNC_OVERLAP = timedelta(seconds=10)
+
+def _conversation_changes(request, pet_pk):
+    participant = models.Q(sender=request.user) | models.Q(receiver=request.user)
+    return (
+        Message.objects.filter(pet_id=pet_pk).filter(participant),
+        MessageTombstone.objects.filter(pet_id=pet_pk).filter(participant),
+    )
+
+def _latest_change(request, pet_pk):
+    chat_messages, tombstones = _conversation_changes(request, pet_pk)
+    stamps = [
+        chat_messages.aggregate(latest=models.Max('updated_at'))['latest'],
+        tombstones.aggregate(latest=models.Max('deleted_at'))['latest'],
+    ]
+    return max((stamp for stamp in stamps if stamp), default=None)
+
+def _sync_etag(request, pet_pk):
+    latest = _latest_change(request, pet_pk)
+    return f"{pet_pk}-{request.user.pk}-{request.GET.get('since', '')}-{latest.timestamp() if latest else 0}"
+
+@login_required
+@condition(etag_func=_sync_etag)
+def message_sync(request, pet_pk):
+    """Messages created, edited or pinned and ids deleted since the `since` cursor.
+
+    Rows from SYNC_OVERLAP before the cursor are sent again; clients apply them idempotently.
+    A cursor older than MESSAGE_TOMBSTONE_DAYS may have missed purged tombstones, so it
+    gets the whole conversation with `resync` set and the client drops everything else.
+    Answers 304 via ETag when nothing changed, so idle polling costs two index lookups.
+    """
+    since = request.GET.get('since')
+    chat_messages, tombstones = _conversation_changes(request, pet_pk)
+    if since:
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if since is None:
+            return JsonResponse({'error': 'Invalid since cursor.'}, status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        if since < timezone.now() - timedelta(days=settings.MESSAGE_TOMBSTONE_DAYS):
+            since = None
+    resync = not since
+    if since:
+        chat_messages = chat_messages.filter(updated_at__gt=since - SYNC_OVERLAP)
+        tombstones = list(tombstones.filter(deleted_at__gt=since - SYNC_OVERLAP))
+    else:
+        tombstones = []
+    changed = list(chat_messages.select_related('sender').order_by('updated_at'))
+    stamps = [since] if since else []
+    stamps += [message.updated_at for message in changed] + [tombstone.deleted_at for tombstone in tombstones]
+    cursor = max(stamps, default=None)
+    return JsonResponse({
+        'messages': [message_event('message', message) for message in changed],
+        'deleted': [tombstone.message_id for tombstone in tombstones],
+        'cursor': cursor.isoformat() if cursor else None,
+        'resync': resync,
     })
 
 @login_required
@@ -231,20 +550,45 @@ def applicants_list(request, pet_id):
     applicants = AdoptionRequest.objects.filter(pet=pet)
     return render(request, 'applicants.html', {'pet': pet, 'applicants': applicants})
 
+def serve_media(request, path):
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_hashed_name(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+def _success_stories_version(request):
+    # Stories show their pet, so a pet edit changes the page; the count catches deletes.
+    stats = SuccessStory.objects.aggregate(
+        latest=models.Max('created_at'), pet_latest=models.Max('pet__updated_at'), count=models.Count('id'),
+    )
+    latest = max(filter(None, [stats['latest'], stats['pet_latest']]), default=None)
+    return latest, stats['count']
+
+@conditional_page(_success_stories_version)
+@read_only_view
 def success_stories(request):
-    stories = SuccessStory.objects.all()
-    return render(request, 'success_stories.html', {'stories': stories})
+    return render(request, 'success_stories.html', {'stories': cached_success_stories()})
 
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count
+
+ANALYTICS_DEFAULT_DAYS = 30
 
 @staff_member_required
+@read_only_view
 def analytics_dashboard(request):
-    pet_types = Pet.objects.values('pet_type').annotate(count=Count('id'))
-    adoption_stats = AdoptionRequest.objects.values('status').annotate(count=Count('id'))
-    user_activity = User.objects.annotate(pet_count=Count('pet'), request_count=Count('adoptionrequest')).order_by('-pet_count')[:10]
+    """Listing, request, adoption and user activity totals for a date range.
+
+    Reads only the daily rollups kept current by `manage.py update_analytics`.
+    """
+    try:
+        end = parse_date(request.GET.get('end') or '') or timezone.localdate()
+        start = parse_date(request.GET.get('start') or '') or end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid date.")
+    if start > end:
+        start, end = end, start
     return render(request, 'analytics_dashboard.html', {
-        'pet_types': pet_types,
-        'adoption_stats': adoption_stats,
-        'user_activity': user_activity,
-    })
\ No newline at end of file
+        'start': start,
+        'end': end,
+        **analytics.summary(start, end),
+    })
@@ -3,6 +3,10 @@ ASGI config for pet_adoption project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this entry point (e.g. ``uvicorn pet_adoption.asgi:application``)
+to use the live chat streams at /messages/<pet>/stream/; they are async views that hold
+a connection open per participant without tying up a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -27,6 +28,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Part of every page ETag; set it per deploy so template changes invalidate clients' copies.
+RELEASE = os.environ.get('RELEASE', '')
+
 
 # Application definition
 
@@ -43,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings include every other middleware.
+    'adoption.perf.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,7 +62,8 @@ ROOT_URLCONF = 'pet_adoption.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for PerformanceMiddleware.
+        'BACKEND': 'adoption.perf.TimedTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +90,41 @@ DATABASES = {
     }
 }
 
+# DATABASE_PROFILE=production: WAL and tuned pragmas, persistent connections,
+# IMMEDIATE transactions and a read-only 'replica' alias for the views marked
+# read_only_view. Needs Django 5.1+ for the init_command and transaction_mode options.
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'development')
+if DATABASE_PROFILE == 'production':
+    from adoption.db import production_databases
+
+    DATABASES = production_databases(BASE_DIR / 'db.sqlite3')
+    DATABASE_ROUTERS = ['adoption.db.ReadOnlyViewRouter']
+
+
+# Where sessions live; pick with SESSION_MODE.
+#   db: a django_session SELECT on every request.
+#   cached_db: read from the cache, written through to django_session; a cache miss
+#       falls back to the row, and so does every read while Redis is unavailable.
+#   signed_cookies: the session is the cookie, so there is nothing to look up. Its
+#       contents are readable (not writable) by the client, it must stay under ~4 KB,
+#       and logging out cannot revoke copies of the cookie taken before.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'accounts.sessions',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = os.environ.get('SESSION_MODE', 'cached_db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+
+# request.user comes from the cache for this long instead of a user SELECT per
+# request, while Redis is available; 0 turns the cache off. ModelBackend stays listed
+# so sessions created before the switch, which name it, keep their login.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_SECONDS = int(os.environ.get('AUTH_USER_CACHE_SECONDS', 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -123,6 +165,9 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Stream every upload to a temp file instead of buffering it in the worker's memory.
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -137,9 +182,33 @@ EMAIL_HOST_USER = 'daemontargerien@gmail.com'
 EMAIL_HOST_PASSWORD = 'juwz jmle mwml fria'  # App-specific password
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# A per-process LRU in front of Redis. If Redis or its client library is missing the
+# tiered backend degrades to per-process memory instead of failing requests.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': 'redis://127.0.0.1:6379/1',
+        'BACKEND': 'adoption.cache_backends.TieredCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'SHARED': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': 'redis://127.0.0.1:6379/1',
+                'OPTIONS': {'socket_connect_timeout': 0.5, 'socket_timeout': 0.5},
+            },
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+        },
     }
-}
\ No newline at end of file
+}
+
+# adoption.perf.PerformanceMiddleware: a Server-Timing header on every response, a
+# JSON log line for requests slower than PERF_SLOW_REQUEST_MS, and cProfile dumps of
+# a PERF_PROFILE_SAMPLE_RATE share of requests (0 turns profiling off). The header
+# shows query counts and cache hits to anyone, so only DEBUG sends it by default.
+PERF_SERVER_TIMING = DEBUG
+PERF_SLOW_REQUEST_MS = int(os.environ.get('PERF_SLOW_REQUEST_MS', 500))
+PERF_PROFILE_SAMPLE_RATE = float(os.environ.get('PERF_PROFILE_SAMPLE_RATE', 0))
+PERF_PROFILE_DIR = os.environ.get('PERF_PROFILE_DIR', BASE_DIR / 'profiles')
+
+# Tombstones of deleted chat messages are kept this long; purge_message_tombstones
+# deletes older ones from cron. A message_sync cursor older than this gets a full resync.
+MESSAGE_TOMBSTONE_DAYS = int(os.environ.get('MESSAGE_TOMBSTONE_DAYS', 30))